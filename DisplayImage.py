@@ -2,6 +2,7 @@ from PyQt5.QtWidgets import QWidget
 from PyQt5.QtGui import QImage, QPen, QColor, QPainter
 from PyQt5.QtCore import Qt, QPointF, QSize, QRectF
 import param
+from pycaqtimage import pycaqtimage
 
 
 # Comments are whether we are in image or screen coordinates.
@@ -18,16 +19,28 @@ class DisplayImage(QWidget):
         self.retry = False
         self.pcnt = 0
         size = param.getSize()
-        self.image = QImage(size, QImage.Format_RGB32)
-        self.image.fill(0)
-        self.rectZoom = param.Rect(0, 0, param.x, param.y)  # image
-        self.arectZoom = param.Rect(0, 0, param.x, param.y)  # image
-        self.rectRoi = param.Rect(0, 0, param.x, param.y)  # image
+        self.images = [QImage(size, QImage.Format_RGB32) for i in (0, 1)]
+        for image in self.images:
+            image.fill(0)
+        self.image = self.images[0]
+        self.views = self.images
+        # The image buffer that colors self.images, see setImageBuffer.
+        self.imageBuffer = None
+        self.front = 0
+        self.direct = False
+        # When zoomed out, the image buffer colors a pair of images from
+        # self.levels instead, decimated by self.decim.
+        self.decim = 1
+        self.smalls = [None, None]
+        self.levels = {}
+        self.rectZoom = param.Rect(0, 0, param.x, param.y)  # sensor
+        self.arectZoom = param.Rect(0, 0, param.x, param.y)  # sensor
+        self.rectRoi = param.Rect(0, 0, param.x, param.y)  # sensor
         self.paintevents = 0
         self.xoff = QPointF(20, 0)
         self.yoff = QPointF(0, 20)
         self.setZoom()
-        self.cursorPos = param.Point(0, 0)  # image
+        self.cursorPos = param.Point(0, 0)  # sensor
         self.setMouseTracking(True)
         self.rectImage = QRectF(0, 0, size.width(), size.height())  # screen
         self.sWindowTitle = "Camera: None"
@@ -102,13 +115,70 @@ class DisplayImage(QWidget):
         self.rectZoom = param.Rect(x, y, w, h)
         self.setZoom()
 
+    def setImageData(self, arrays):
+        # Color frames are packed RGB already, so display them from QImages
+        # sharing the memory of the image arrays.  QImage doesn't keep its
+        # data alive, so we have to.
+        self.arrays = arrays
+        self.views = [
+            QImage(a.data, a.shape[1], a.shape[0], a.strides[0], QImage.Format_RGB32)
+            for a in arrays
+        ]
+
+    def setFrontImage(self, front, direct=False):
+        self.front = front
+        self.direct = direct
+        self.image = self.views[front] if direct else self.images[front]
+
+    def setImageBuffer(self, imageBuffer):
+        # The image buffer only colors the part of the image we show.
+        self.imageBuffer = imageBuffer
+        self.setViewport()
+
+    def setViewport(self, full=False):
+        # When zoomed out, there's no point coloring more pixels than the
+        # screen has, so color the level of the image buffer's pyramid that
+        # is closest to screen resolution without going under it.  If full,
+        # color the whole image at full resolution.
+        if self.imageBuffer is None:
+            return
+        decim = 1
+        if full:
+            rect = QRectF(0, 0, param.width(), param.height())
+        else:
+            rect = self.arectZoom.oriented()
+            while 0 < param.zoom * decim * 2 <= 1:
+                decim *= 2
+        if decim == 1:
+            smalls = [None, None]
+        elif decim in self.levels:
+            smalls = self.levels[decim]
+        else:
+            size = QSize(-(-param.width() // decim), -(-param.height() // decim))
+            smalls = [QImage(size, QImage.Format_RGB32) for i in (0, 1)]
+            for small in smalls:
+                small.fill(0)
+            self.levels[decim] = smalls
+        pycaqtimage.pySetViewport(self.imageBuffer, rect, decim, smalls[0], smalls[1])
+        self.decim = decim
+        self.smalls = smalls
+
     def setImageSize(self, reset=True):
+        # The old image buffer colors the old images, not these.
+        self.imageBuffer = None
+        self.decim = 1
+        self.smalls = [None, None]
+        self.levels = {}
         size = param.getSize()
-        self.image = QImage(size, QImage.Format_RGB32)
-        self.image.fill(0)
+        self.images = [QImage(size, QImage.Format_RGB32) for i in (0, 1)]
+        for image in self.images:
+            image.fill(0)
+        self.image = self.images[0]
+        self.views = self.images
         if reset:
-            self.rectZoom = param.Rect(0, 0, param.x, param.y)
-            self.rectRoi = param.Rect(0, 0, param.x, param.y)
+            sensorx, sensory = param.x * param.binx, param.y * param.biny
+            self.rectZoom = param.Rect(0, 0, sensorx, sensory)
+            self.rectRoi = param.Rect(0, 0, sensorx, sensory)
         self.setZoom()
         self.gui.updateRoiText()
         self.gui.updateMiscInfo()
@@ -147,7 +217,20 @@ class DisplayImage(QWidget):
         )
 
         # Draw arectZoom portion of image into rectImage
-        painter.drawImage(self.rectImage, self.image, self.arectZoom.oriented())
+        if self.decim > 1 and not self.direct:
+            rect = self.arectZoom.oriented()
+            painter.drawImage(
+                self.rectImage,
+                self.smalls[self.front],
+                QRectF(
+                    rect.x() / self.decim,
+                    rect.y() / self.decim,
+                    rect.width() / self.decim,
+                    rect.height() / self.decim,
+                ),
+            )
+        else:
+            painter.drawImage(self.rectImage, self.image, self.arectZoom.oriented())
 
         painter.setOpacity(1)
 
@@ -416,6 +499,7 @@ class DisplayImage(QWidget):
 
         if abs((fWidthRatio - fHeightRatio) / fWidthRatio) < 0.01:
             param.zoom = w / self.arectZoom.oriented().width()
+            self.setViewport()
             return
 
         if fWidthRatio > fHeightRatio:
@@ -439,12 +523,13 @@ class DisplayImage(QWidget):
             self.arectZoom.setTop(fNewZoomY)
             self.arectZoom.setHeight(fNewZoomHeight)
         param.zoom = w / self.arectZoom.oriented().width()
+        self.setViewport()
 
     def zoomReset(self):
         self.zoomByFactor(self.rectZoom.oriented().width() / self.width())
 
     def roiReset(self):
-        self.rectRoi = param.Rect(0, 0, param.width(), param.height())
+        self.rectRoi = param.Rect(0, 0, param.x * param.binx, param.y * param.biny)
         self.gui.updateRoiText()
         self.update()
         if self.gui.cfg is None:
@@ -515,7 +600,8 @@ def reset_markers(markers: list[param.Point]) -> None:
     vertically away from each of the corners of the image, not on the image
     itself but off of it.
     """
+    sensorx, sensory = param.x * param.binx, param.y * param.biny
     markers[0].setAbs(-100, -100)
-    markers[1].setAbs(param.x + 100, -100)
-    markers[2].setAbs(param.x + 100, param.y + 100)
-    markers[3].setAbs(-100, param.y + 100)
+    markers[1].setAbs(sensorx + 100, -100)
+    markers[2].setAbs(sensorx + 100, sensory + 100)
+    markers[3].setAbs(-100, sensory + 100)
@@ -1,201 +1,179 @@
-from PyQt5.QtGui import QImage, QTransform, QPainter
-from PyQt5.QtCore import QRectF
+from PyQt5.QtGui import QColor, QImage, QPainter, QPen, QPolygonF
+from PyQt5.QtCore import QObject, QRectF, Qt, pyqtSignal
 from PyQt5.QtWidgets import QWidget
 import param
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-from matplotlib.figure import Figure
-from lmfit.models import (
-    GaussianModel,
-    Model,
-    update_param_vals,
-    guess_from_peak,
-    fwhm_expr,
-    height_expr,
-)
+import projfit
+import threading
 import numpy as np
 
-# From lmfit.lineshapes, because it's not worth importing...
-#
-s2pi = np.sqrt(2 * np.pi)
-# tiny had been numpy.finfo(numpy.float64).eps ~=2.2e16.
-# here, we explicitly set it to 1.e-15 == numpy.finfo(numpy.float64).resolution
-tiny = 1.0e-15
-
-
-def gaussian_with_base(x, amplitude=1.0, center=0.0, sigma=1.0, base=0.0):
-    return base + (
-        (amplitude / (max(tiny, s2pi * sigma)))
-        * np.exp(-((1.0 * x - center) ** 2) / max(tiny, (2 * sigma**2)))
-    )
-
-
-def sg4(x, amplitude=1.0, center=0.0, width=1.0):
-    return amplitude * np.exp(-2.0 * ((x - center) ** 4 / max(tiny, width**4)))
-
-
-def sg4_with_base(x, amplitude=1.0, center=0.0, width=1.0, base=0.0):
-    return base + amplitude * np.exp(-2.0 * ((x - center) ** 4 / max(tiny, width**4)))
-
-
-def sg6(x, amplitude=1.0, center=0.0, width=1.0):
-    return amplitude * np.exp(-2.0 * ((x - center) ** 6 / max(tiny, width**6)))
-
-
-def sg6_with_base(x, amplitude=1.0, center=0.0, width=1.0, base=0.0):
-    return base + amplitude * np.exp(-2.0 * ((x - center) ** 6 / max(tiny, width**6)))
 
+class FitResult:
+    """A fit of the projection at pixels x, and the widths in pixels."""
 
-# A shameless copy from lmfit.
-class GaussianModelWithBase(Model):
-    r"""A model based on a Gaussian or normal distribution lineshape.
+    def __init__(self, seq, x, best_fit, fwhm, e2w):
+        self.seq = seq
+        self.x = x
+        self.best_fit = best_fit
+        self.fwhm = fwhm
+        self.e2w = e2w
 
-    The model has three Parameters: `amplitude`, `center`, and `sigma`.
-    In addition, parameters `fwhm` and `height` are included as
-    constraints to report full width at half maximum and maximum peak
-    height, respectively.
-
-    .. math::
-
-        f(x; A, \mu, \sigma) = \frac{A}{\sigma\sqrt{2\pi}} e^{[{-{(x-\mu)^2}/{{2\sigma}^2}}]}
-
-    where the parameter `amplitude` corresponds to :math:`A`, `center` to
-    :math:`\mu`, and `sigma` to :math:`\sigma`. The full width at half
-    maximum is :math:`2\sigma\sqrt{2\ln{2}}`, approximately
-    :math:`2.3548\sigma`.
-
-    For more information, see: https://en.wikipedia.org/wiki/Normal_distribution
 
+class FitWorker(QObject):
+    """
+    Fits projections on a thread of its own, so the display never waits for
+    one.  Only the latest request is kept: submitting replaces any request
+    that hasn't been started yet.  Each fit comes back through fitDone, which
+    is delivered in the GUI thread, as a FitResult or None if it failed.
     """
 
-    fwhm_factor = 2 * np.sqrt(2 * np.log(2))
-    height_factor = 1.0 / np.sqrt(2 * np.pi)
-
-    def __init__(self, independent_vars=["x"], prefix="", nan_policy="raise", **kwargs):
-        kwargs.update(
-            {
-                "prefix": prefix,
-                "nan_policy": nan_policy,
-                "independent_vars": independent_vars,
-            }
+    fitDone = pyqtSignal(object)
+
+    def __init__(self):
+        QObject.__init__(self)
+        self.cond = threading.Condition()
+        self.request = None
+        self.lastFit = None  # The last projfit fit, to warm start the next.
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, request):
+        with self.cond:
+            self.request = request
+            self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while self.request is None:
+                    self.cond.wait()
+                request = self.request
+                self.request = None
+            try:
+                result = self.doFit(*request)
+            except Exception as e:
+                print("fit:: exception: ", e)
+                result = None
+            self.fitDone.emit(result)
+
+    def doFit(self, seq, kind, with_base, precise, x, y):
+        if not precise:
+            out = projfit.fit(kind, with_base, x, y, self.lastFit)
+            self.lastFit = out
+            if out is None:
+                return None
+            return FitResult(seq, x, out.best_fit, out.fwhm, out.e2w)
+        import fitmodels  # Not until it's needed, see there.
+
+        if kind == projfit.GAUSSIAN:
+            if with_base:
+                mod = fitmodels.GaussianModelWithBase()
+            else:
+                mod = fitmodels.GaussianModel()
+            mod.set_param_hint("e2w", expr="1.699*fwhm")
+        elif kind == projfit.SG4:
+            mod = fitmodels.SG4Model(with_base)
+        else:
+            mod = fitmodels.SG6Model(with_base)
+        pars = mod.guess(y, x=x)
+        out = mod.fit(y, pars, x=x)
+        # What do we have here?
+        #     out.params['amplitude'].value is the amplitude.
+        #     out.params['center'].value is the mean if is_x, and
+        #         self.gui.image.shape[1] - 1 - out.params['center'].value otherwise.
+        #     out.params['sigma'].value is the std deviation if Gaussian.
+        #     out.params['width'].value is the width if Super Gaussian.
+        #     out.params['fwhm'].value is the FWHM.
+        #     out.params['e2w'].value is the 1/e^2 width.
+        return FitResult(
+            seq, x, out.best_fit, out.params["fwhm"].value, out.params["e2w"].value
         )
-        super().__init__(gaussian_with_base, **kwargs)
-        self._set_paramhints_prefix()
-
-    def _set_paramhints_prefix(self):
-        self.set_param_hint("sigma", min=0)
-        self.set_param_hint("fwhm", expr=fwhm_expr(self))
-        self.set_param_hint("height", expr=height_expr(self))
 
-    def guess(self, data, x, negative=False, **kwargs):
-        """Estimate initial model parameter values from data."""
-        pars = guess_from_peak(self, data, x, negative)
-        return update_param_vals(pars, self.prefix, **kwargs)
 
+# What paintPlot draws like matplotlib: the figure color ("0.75"), the default
+# line width of 1.5 points at 100 dpi, and the colors of the curves.
+PLOT_BACKGROUND = QColor(191, 191, 191)
+PLOT_LINE_WIDTH = 1.5 * 100 / 72
+PLOT_COLORS = {"g": QColor(0, 128, 0), "k": QColor(0, 0, 0)}
 
-class SG4Model(Model):
-    r"""A model based on a SuperGaussian model with p == 4.
 
-    The model has three Parameters: `amplitude`, `center`, and `width`.
-    In addition, parameters `fwhm` and `e2w` are also reported as
-    constraints to report full width at half maximum and 1/e^2 width,
-    respectively.
+def _qcolor(color):
+    if isinstance(color, str):
+        return PLOT_COLORS[color]
+    return QColor.fromRgbF(*color)
 
-    .. math::
 
-        f(x; A, c, w, p) = A*e^{-2((x-c)/w)^p}
-
-    where `amplitude` is :math:`A`, `center` is :math:`c`, and `width`
-    is :math:`w`. p is a constant 4.
+class ProjFigure:
     """
+    The matplotlib figure of one projection plot, kept from frame to frame and
+    only remade when the view size changes.  The curves are animated lines,
+    so a frame just restores the cached background and draws them over it.
+    The background only changes when the axes move, with the zoom or the ROI.
 
-    def __init__(
-        self, with_base, independent_vars=["x"], prefix="", nan_policy="raise", **kwargs
-    ):
-        kwargs.update(
-            {
-                "prefix": prefix,
-                "nan_policy": nan_policy,
-                "independent_vars": independent_vars,
-            }
-        )
-        self.with_base = with_base
-        if self.with_base:
-            super().__init__(sg4_with_base, **kwargs)
-        else:
-            super().__init__(sg4, **kwargs)
-        self._set_paramhints_prefix()
-
-    def _set_paramhints_prefix(self):
-        self.set_param_hint("width", min=0)
-        self.set_param_hint("fwhm", expr="1.5345*width")
-        self.set_param_hint("e2w", expr="2*width")
-
-    def guess(self, data, x, negative=False, **kwargs):
-        """Estimate initial model parameter values from data."""
-        maxy, miny = max(data), min(data)
-        maxx, minx = max(x), min(x)
-        cen = x[np.argmax(data)]
-        height = (maxy - miny) * 3.0
-        sig = (maxx - minx) / 6.0
-        if self.with_base:
-            pars = self.make_params(amplitude=height, center=cen, width=sig, base=0)
-        else:
-            pars = self.make_params(amplitude=height, center=cen, width=sig)
-        pars[f"{self.prefix}width"].set(min=0.0)
-        return update_param_vals(pars, self.prefix, **kwargs)
-
-
-class SG6Model(Model):
-    r"""A model based on a SuperGaussian model with p == 6.
-
-    The model has three Parameters: `amplitude`, `center`, and `width`.
-    In addition, parameters `fwhm` and `e2w` are also reported as
-    constraints to report full width at half maximum and 1/e^2 width,
-    respectively.
+    The vertical plot is drawn upright, the pixels going up the y axis and
+    the values to the left, rather than drawn like the horizontal one and
+    rotated.
 
-    .. math::
-
-        f(x; A, c, w, p) = A*e^{-2((x-c)/w)^p}
-
-    where `amplitude` is :math:`A`, `center` is :math:`c`, and `width`
-    is :math:`w`. p is a constant 6.
+    This is only used to show the fits.  Otherwise ProjWidget draws the
+    curves itself, so matplotlib isn't imported until the first fit.
     """
 
-    def __init__(
-        self, with_base, independent_vars=["x"], prefix="", nan_policy="raise", **kwargs
-    ):
-        kwargs.update(
-            {
-                "prefix": prefix,
-                "nan_policy": nan_policy,
-                "independent_vars": independent_vars,
-            }
-        )
-        self.with_base = with_base
-        if self.with_base:
-            super().__init__(sg6_with_base, **kwargs)
+    def __init__(self, is_x, view_width, view_height):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+        from matplotlib.figure import Figure
+
+        self.is_x = is_x
+        self.size = (view_width, view_height)
+        if is_x:
+            figsize = (view_width / 100.0, view_height / 100.0)
         else:
-            super().__init__(sg6, **kwargs)
-        self._set_paramhints_prefix()
-
-    def _set_paramhints_prefix(self):
-        self.set_param_hint("width", min=0)
-        self.set_param_hint("fwhm", expr="1.6762*width")
-        self.set_param_hint("e2w", expr="2*width")
-
-    def guess(self, data, x, negative=False, **kwargs):
-        """Estimate initial model parameter values from data."""
-        maxy, miny = max(data), min(data)
-        maxx, minx = max(x), min(x)
-        cen = x[np.argmax(data)]
-        height = (maxy - miny) * 3.0
-        sig = (maxx - minx) / 6.0
-        if self.with_base:
-            pars = self.make_params(amplitude=height, center=cen, width=sig, base=0)
+            figsize = (view_height / 100.0, view_width / 100.0)
+        self.fig = Figure(figsize=figsize, dpi=100)
+        self.canvas = FigureCanvas(self.fig)
+        self.fig.patch.set_facecolor("0.75")  # Qt5 defaults to white!!
+        self.ax = self.fig.add_axes([0, 0, 1, 1])
+        # Turn off borders and the axis labels.
+        self.ax.spines["top"].set_visible(False)
+        self.ax.spines["right"].set_visible(False)
+        self.ax.spines["bottom"].set_visible(False)
+        self.ax.spines["left"].set_visible(False)
+        self.ax.get_xaxis().set_visible(False)
+        self.ax.get_yaxis().set_visible(False)
+        self.lines = []
+        self.position = None
+        self.background = None
+
+    def render(self, pad, scale, curves, xmin, xmax, ymin, ymax):
+        if self.position != (pad, scale):
+            self.position = (pad, scale)
+            if self.is_x:
+                self.ax.set_position([pad, 0, scale, 1])
+            else:
+                self.ax.set_position([0, pad, 1, scale])
+            for line in self.lines:
+                line.set_visible(False)
+            self.canvas.draw()
+            self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        while len(self.lines) < len(curves):
+            self.lines.append(self.ax.plot([], [], "-", animated=True)[0])
+        if self.is_x:
+            self.ax.set_xlim([xmin, xmax])
+            self.ax.set_ylim([ymin, ymax])
         else:
-            pars = self.make_params(amplitude=height, center=cen, width=sig)
-        pars[f"{self.prefix}width"].set(min=0.0)
-        return update_param_vals(pars, self.prefix, **kwargs)
+            self.ax.set_xlim([ymax, ymin])
+            self.ax.set_ylim([xmin, xmax])
+        self.canvas.restore_region(self.background)
+        for (line, (x, y, color)) in zip(self.lines, curves):
+            if self.is_x:
+                line.set_data(x, y)
+            else:
+                line.set_data(y, x)
+            line.set_color(color)
+            line.set_visible(True)
+            self.ax.draw_artist(line)
+        for line in self.lines[len(curves) :]:
+            line.set_visible(False)
+        width, height = self.canvas.get_width_height()
+        return QImage(self.canvas.buffer_rgba(), width, height, QImage.Format_RGBA8888)
 
 
 #
@@ -213,6 +191,13 @@ class ProjWidget(QWidget):
         self.hint = self.size()
         self.is_x = True
         self.image = None
+        self.plot = None
+        self.fit = None
+        self.fitSeq = 0
+        self.lastRange = None
+        self.figure = None
+        self.fitWorker = FitWorker()
+        self.fitWorker.fitDone.connect(self.onFitDone)
 
     @property
     def lineout_cbs(self):
@@ -242,74 +227,90 @@ class ProjWidget(QWidget):
     def sizeHint(self):
         return self.hint
 
-    def plotFit(self, ax, is_x, x, y, xmin, xmax, ymin, ymax):
+    # Ask the fit worker to fit y, dropping any earlier request it hasn't started.
+    def submitFit(self, x, y):
         if self.gui.ui.radioGaussian.isChecked():
-            if self.gui.ui.checkBoxConstant.isChecked():
-                mod = GaussianModelWithBase()
-            else:
-                mod = GaussianModel()
-            mod.set_param_hint("e2w", expr="1.699*fwhm")
+            kind = projfit.GAUSSIAN
         elif self.gui.ui.radioSG4.isChecked():
-            mod = SG4Model(self.gui.ui.checkBoxConstant.isChecked())
+            kind = projfit.SG4
         elif self.gui.ui.radioSG6.isChecked():
-            mod = SG6Model(self.gui.ui.checkBoxConstant.isChecked())
+            kind = projfit.SG6
         else:
             return  # Not sure how we manage to check nothing here?!?
-        pars = mod.guess(y, x=x)
-        out = mod.fit(y, pars, x=x)
-        ax.plot(x, out.best_fit, "k-")
-        t = min(out.best_fit)
+        self.fitSeq += 1
+        self.fitWorker.submit(
+            (
+                self.fitSeq,
+                kind,
+                self.gui.ui.checkBoxConstant.isChecked(),
+                self.gui.ui.checkBoxPreciseFit.isChecked(),
+                x,
+                y,
+            )
+        )
+
+    # In the GUI thread, when the worker has a fit.
+    def onFitDone(self, result):
+        self.fit = result
+        if result is None:
+            return
+        self.showWidths(result.fwhm, result.e2w)
+        # Redraw with it, unless a newer fit is on the way anyway.
+        if result.seq == self.fitSeq and self.lastRange is not None:
+            self.makeImage(*self.lastRange, submit=False)
+
+    # Draw the latest fit, which may be of a frame or two ago.
+    def plotFit(self, curves, ymin, ymax):
+        if self.fit is None:
+            return (ymin, ymax)
+        curves.append((self.fit.x, self.fit.best_fit, "k"))
+        t = min(self.fit.best_fit)
         if t < ymin:
             ymin = t
-        t = max(out.best_fit)
+        t = max(self.fit.best_fit)
         if t > ymax:
             ymax = t
-        # What do we have here?
-        #     out.params['amplitude'].value is the amplitude.
-        #     out.params['center'].value is the mean if is_x, and
-        #         self.gui.image.shape[1] - 1 - out.params['center'].value otherwise.
-        #     out.params['sigma'].value is the std deviation if Gaussian.
-        #     out.params['width'].value is the width if Super Gaussian.
-        #     out.params['fwhm'].value is the FWHM.
-        #     out.params['e2w'].value is the 1/e^2 width.
-        # All need to be scaled by self.gui.calib!
-        fwhm = self.gui.calib * out.params["fwhm"].value
-        e2w = self.gui.calib * out.params["e2w"].value
+        return (ymin, ymax)
+
+    def showWidths(self, fwhm, e2w):
+        # Both are in pixels, and need to be scaled by self.gui.calib!
+        fwhm = self.gui.calib * fwhm
+        e2w = self.gui.calib * e2w
         if self.is_x:
             self.gui.ui.lineEditFWHMx.setText(self.gui.displayFormat % (fwhm))
             self.gui.ui.lineEdite2x.setText(self.gui.displayFormat % (e2w))
         else:
             self.gui.ui.lineEditFWHMy.setText(self.gui.displayFormat % (fwhm))
             self.gui.ui.lineEdite2y.setText(self.gui.displayFormat % (e2w))
-        return (ymin, ymax)
 
-    def plotLineout(
-        self, ax, is_x, size, x, idx, xmin, xmax, ymin, ymax, marker, color
-    ):
+    def plotLineout(self, curves, is_x, size, x, idx, ymin, ymax, marker, color):
         if is_x:
             i = int(marker.y())
             if i < 0 or i >= size:
                 return (ymin, ymax)
-            y = self.gui.image[i, idx]
+            y = self.gui.pixelImage()[i, idx]
         else:
             i = int(marker.x())
             if i < 0 or i >= size:
                 return (ymin, ymax)
-            y = self.gui.image[idx, i]
+            y = self.gui.pixelImage()[idx, i]
         t = min(y)
         if t < ymin:
             ymin = t
         t = max(y)
         if t > ymax:
             ymax = t
-        ax.plot(x, y, "-", color=color)
+        curves.append((x, y, color))
         self.yplot = y
         return (ymin, ymax)
 
-    # Make the image to display.  This should match the view size.
-    def makeImage(self, xminR, xmaxR, yminR, ymaxR):
+    # Make the image to display.  This should match the view size.  The fit
+    # of the projection is only asked for here, and drawn when it's done, unless
+    # submit is False.
+    def makeImage(self, xminR, xmaxR, yminR, ymaxR, submit=True):
         if not self.isVisible():
             return (0, 100)
+        self.lastRange = (xminR, xmaxR, yminR, ymaxR)
         rectZoom = self.gui.ui.display_image.arectZoom.oriented()  # image
         rectRoi = self.gui.ui.display_image.rectRoi.oriented()  # image
         if self.is_x:
@@ -348,6 +349,7 @@ class ProjWidget(QWidget):
         # seem to be larger than this.  I'd like to believe that 1 would be OK though.
         if abs(screen_width - view_width / param.zoom) > 10:
             self.image = None
+            self.plot = None
             return (
                 ymin,
                 ymax,
@@ -366,23 +368,12 @@ class ProjWidget(QWidget):
         # We have data from roi_start to roi_end.
         # The plot range should be mn to mx.
         #
-        fig = Figure(figsize=(view_width / 100.0, view_height / 100.0), dpi=100)
-        canvas = FigureCanvas(fig)
-        fig.patch.set_facecolor("0.75")  # Qt5 defaults to white!!
         # We want to display beteen roi_start and roi_end.  What fits though?
         if (
             roi_end < screen_start or screen_end < roi_start or roi_start == roi_end
         ):  # Nothing!!
-            canvas.draw()
-            width, height = canvas.get_width_height()
-            if self.is_x:
-                self.image = QImage(
-                    canvas.buffer_rgba(), width, height, QImage.Format_RGBA8888
-                )
-            else:
-                self.image = QImage(
-                    canvas.buffer_rgba(), height, width, QImage.Format_RGBA8888
-                )
+            self.image = None
+            self.plot = (0, 0, [], 0, 1, 0, 1)
             self.update()
             return (ymin, ymax)
         # Cut a little off the ends if needed, scale and pad appropriately.
@@ -408,69 +399,104 @@ class ProjWidget(QWidget):
                 if screen_end <= roi_end
                 else (screen_end - roi_end) / float(screen_width)
             )
-        ax = fig.add_axes([pad, 0, scale, 1])
-        # Turn off borders and the axis labels.
-        ax.spines["top"].set_visible(False)
-        ax.spines["right"].set_visible(False)
-        ax.spines["bottom"].set_visible(False)
-        ax.spines["left"].set_visible(False)
-        ax.get_xaxis().set_visible(False)
-        ax.get_yaxis().set_visible(False)
         idx = np.logical_and(xidx >= xmin, xidx <= xmax)
         x = xidx[idx]
         y = proj[idx]
 
         # MCB - The past, as they say, is prologue.  So what do we have here?
-        #     ax   - A matplotlib Axes.
+        #     curves - A list of (x, y, color) to draw, in matplotlib colors.
         #     x    - A np array of pixel coordinates, in the oriented frame.
         #     y    - A np array of projection sums, in the oriented frame.
-        #     self.gui.image - A np array containing the most recent full image, oriented.
+        #     self.gui.pixelImage() - A np array of the most recent full image, oriented.
         #     xmin, xmax, ymin, ymax - The limits of the plot.
         #
         # At this point, we should plot whatever we want to plot and fit whatever
         # we want to fit.
 
+        curves = []
+        fitting = False
         self.yplot = None
         for (ii, cb) in enumerate(self.lineout_cbs):
             if cb.isChecked():
                 (ymin, ymax) = self.plotLineout(
-                    ax,
+                    curves,
                     self.is_x,
                     linelim,
                     x,
                     idx,
-                    xmin,
-                    xmax,
                     ymin,
                     ymax,
                     self.gui.ui.display_image.lMarker[ii].oriented(),
                     self.gui.ui.display_image.lPenColor[ii],
                 )
         if self.gui.ui.checkBoxProjRoi.isChecked():
-            ax.plot(x, y, "g-")
+            curves.append((x, y, "g"))
             self.yplot = y
         if self.gui.ui.checkBoxFits.isChecked() and self.yplot is not None:
-            (ymin, ymax) = self.plotFit(
-                ax, self.is_x, x, self.yplot, xmin, xmax, ymin, ymax
-            )
+            if submit:
+                self.submitFit(x, self.yplot)
+            (ymin, ymax) = self.plotFit(curves, ymin, ymax)
+            fitting = True
 
         # MCB - End of plotting.
 
-        # Crop the plot appropriately, and send it off to be displayed.
-        ax.set_xlim([xmin, xmax])
-        ax.set_ylim([ymin, ymax])
-        canvas.draw()
-        width, height = canvas.get_width_height()
-        img = QImage(canvas.buffer_rgba(), width, height, QImage.Format_RGBA8888)
-        if self.is_x:
-            self.image = img
+        # Crop the plot appropriately, and send it off to be displayed.  The
+        # fits go through matplotlib, but the plain curves paintEvent can draw.
+        if fitting:
+            if self.figure is None or self.figure.size != (view_width, view_height):
+                self.figure = ProjFigure(self.is_x, view_width, view_height)
+            self.image = self.figure.render(pad, scale, curves, xmin, xmax, ymin, ymax)
+            self.plot = None
         else:
-            self.image = img.transformed(QTransform().rotate(-90))
+            self.image = None
+            self.plot = (pad, scale, curves, xmin, xmax, ymin, ymax)
         self.update()
         return (ymin, ymax)
 
+    # Draw self.plot like ProjFigure would, but with QPainter.
+    def paintPlot(self, painter, pad, scale, curves, xmin, xmax, ymin, ymax):
+        w = self.width()
+        h = self.height()
+        painter.fillRect(QRectF(0, 0, w, h), PLOT_BACKGROUND)
+        if scale <= 0:
+            return
+        if self.is_x:
+            rectAxes = QRectF(pad * w, 0, scale * w, h)
+        else:
+            rectAxes = QRectF(0, (1 - pad - scale) * h, w, scale * h)
+        painter.fillRect(rectAxes, Qt.white)
+        painter.setClipRect(rectAxes)
+        painter.setRenderHint(QPainter.Antialiasing)
+        xscale = 1.0 / (xmax - xmin) if xmax > xmin else 0.0
+        yscale = 1.0 / (ymax - ymin) if ymax > ymin else 0.0
+        for (x, y, color) in curves:
+            if len(x) < 2:
+                continue
+            # Where along the plot and how high, as fractions of the view.
+            along = pad + scale * (x - xmin) * xscale
+            up = (y - ymin) * yscale
+            points = np.empty((len(x), 2))
+            if self.is_x:
+                points[:, 0] = along * w
+                points[:, 1] = (1 - up) * h
+            else:
+                points[:, 0] = (1 - up) * w
+                points[:, 1] = (1 - along) * h
+            # Fill the polygon's QPointFs, which are pairs of doubles, directly.
+            polygon = QPolygonF(len(x))
+            data = polygon.data()
+            data.setsize(points.nbytes)
+            np.frombuffer(data, dtype=np.float64)[:] = points.ravel()
+            pen = QPen(_qcolor(color), PLOT_LINE_WIDTH)
+            pen.setCapStyle(Qt.SquareCap)
+            pen.setJoinStyle(Qt.RoundJoin)
+            painter.setPen(pen)
+            painter.drawPolyline(polygon)
+
     def paintEvent(self, event):
         if self.image is None:
+            if self.plot is not None:
+                self.paintPlot(QPainter(self), *self.plot)
             return
         painter = QPainter(self)
         w = self.width()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Time the pycaqtimage frame processing for each of the 8 orientations.
+
+This feeds a synthetic frame through pyProcessFrame, the same path the camera
+callback takes, and prints the time per frame and throughput.  For example:
+
+    python benchmark.py --width 2448 --height 2048 --threads 4
+
+Add --bin N to bin the frame NxN first.
+"""
+import sys
+import time
+
+import numpy as np
+from PyQt5.QtGui import QImage
+
+import param
+from options import Options
+from pycaqtimage import pycaqtimage
+
+ORIENTATIONS = [
+    ("0", param.ORIENT0),
+    ("0F", param.ORIENT0F),
+    ("90", param.ORIENT90),
+    ("90F", param.ORIENT90F),
+    ("180", param.ORIENT180),
+    ("180F", param.ORIENT180F),
+    ("270", param.ORIENT270),
+    ("270F", param.ORIENT270F),
+]
+
+
+def make_frame(width, height, bits, color):
+    dtype = np.uint8 if bits <= 8 else np.uint16 if bits <= 16 else np.uint32
+    shape = (height, width, 3) if color else (height, width)
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 1 << bits, size=shape, dtype=dtype)
+
+
+def run(frame, width, height, bits, orientation, threads, frames, color, binning):
+    camwidth, camheight = width, height
+    width, height = width // binning, height // binning
+    if orientation & 2:
+        image = np.zeros((width, height), dtype=np.uint32)
+        px = np.zeros((height), dtype=np.float64)
+        py = np.zeros((width), dtype=np.float64)
+        qimage = QImage(height, width, QImage.Format_RGB32)
+    else:
+        image = np.zeros((height, width), dtype=np.uint32)
+        px = np.zeros((width), dtype=np.float64)
+        py = np.zeros((height), dtype=np.float64)
+        qimage = QImage(width, height, QImage.Format_RGB32)
+    imageBuffer = pycaqtimage.pyCreateImageBuffer(
+        qimage, px, py, image, camwidth, camheight, orientation, binning, binning
+    )
+    pycaqtimage.pySetThreadCount(imageBuffer, threads)
+    maxcolor = ((1 << bits) - 1) * binning * binning
+    pycaqtimage.pySetGrayMap(imageBuffer, 0, min(maxcolor, 2**31 - 1), 0)
+    if color:
+        pycaqtimage.pyCreateColorImagePvCallbackFunc(imageBuffer)
+    else:
+        pycaqtimage.pyCreateImagePvCallbackFunc(imageBuffer)
+    pycaqtimage.pySetFrameAverage(1, imageBuffer)
+
+    pycaqtimage.pyProcessFrame(imageBuffer, frame)  # Warm up.
+    start = time.perf_counter()
+    for i in range(frames):
+        pycaqtimage.pyProcessFrame(imageBuffer, frame)
+    return (time.perf_counter() - start) / frames
+
+
+if __name__ == "__main__":
+    options = Options(
+        [], ["width", "height", "bits", "threads", "frames", "bin"], ["color"]
+    )
+    try:
+        options.parse()
+    except Exception as e:
+        options.usage(str(e.args))
+        sys.exit()
+
+    width = 2448 if options.width is None else int(options.width)
+    height = 2048 if options.height is None else int(options.height)
+    bits = 12 if options.bits is None else int(options.bits)
+    threads = 1 if options.threads is None else int(options.threads)
+    frames = 20 if options.frames is None else int(options.frames)
+    binning = 1 if options.bin is None else int(options.bin)
+    color = options.color is not None
+
+    frame = make_frame(width, height, bits, color)
+    print(
+        "%dx%d %d-bit %s, %d thread(s), %dx%d binning"
+        % (width, height, bits, "color" if color else "mono", threads, binning, binning)
+    )
+    for name, orientation in ORIENTATIONS:
+        t = run(
+            frame, width, height, bits, orientation, threads, frames, color, binning
+        )
+        print(
+            "%-5s %8.2f ms/frame %8.1f Mpixel/s"
+            % (name, t * 1e3, width * height / t / 1e6)
+        )
@@ -37,6 +37,7 @@ if __name__ == "__main__":
             "scale",
             "min_timeout",
             "max_timeout",
+            "threads",
         ],
         [],
     )
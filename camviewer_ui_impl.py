@@ -43,6 +43,7 @@ from PyQt5.QtWidgets import (
     QDialogButtonBox,
     QFileDialog,
     QFormLayout,
+    QInputDialog,
     QLabel,
     QMainWindow,
     QMessageBox,
@@ -51,6 +52,7 @@ from PyQt5.QtWidgets import (
     QWidget,
 )
 
+import colormaps
 import param
 from cam_types import CamTypeScreenGenerator
 from camviewer_ui import Ui_MainWindow
@@ -224,6 +226,10 @@ class NoScrollWheelFilter(QObject):
 
 SINGLE_FRAME = 0
 LOCAL_AVERAGE = 2
+EXP_AVERAGE = 3
+
+# The percentiles for each comboBoxAutoRange entry, None for the min/max.
+AUTO_RANGE_PERCENTILES = [None, (0.1, 99.9), (1.0, 99.0)]
 
 
 class GraphicUserInterface(QMainWindow):
@@ -275,6 +281,21 @@ class GraphicUserInterface(QMainWindow):
             except Exception:
                 pass
 
+        # Generate the colormap tables, falling back to a scratch directory if
+        # the config directory isn't writable.
+        try:
+            self.colormapFiles = colormaps.install_colormaps(self.cfgdir + "colormaps")
+        except OSError:
+            self.colormapFiles = colormaps.install_colormaps(
+                tempfile.mkdtemp(prefix="camviewer-")
+            )
+
+        # Threads for the pycaqtimage frame processing, counting the CA thread.
+        if self.options.threads is not None:
+            self.nthreads = max(int(self.options.threads), 1)
+        else:
+            self.nthreads = min(os.cpu_count() or 1, 4)
+
         # View parameters
         self.viewwidth = 640  # Size of our viewing area.
         self.viewheight = 640  # Size of our viewing area.
@@ -286,12 +307,15 @@ class GraphicUserInterface(QMainWindow):
         # Default to VGA!
         param.setImageSize(640, 480)
         self.isColor = False
+        self.isFloat = False
         self.bits = 12
         self.maxcolor = 1023
+        self.sensorSize = (param.x, param.y)
         self.lastUpdateTime = time.time()
         self.dispUpdates = 0
         self.lastDispUpdates = 0
         self.average = 1
+        self.emaFrames = 10.0
         param.orientation = param.ORIENT0
         self.connected = False
         self.selected_cam_ready = False
@@ -319,6 +343,7 @@ class GraphicUserInterface(QMainWindow):
         self.averageCur = 0
         self.iRangeMin = 0
         self.iRangeMax = 1023
+        self.colorMap = "hot"
         self.camactions = []
         self.lastwidth = 0
         self.useglobmarks = True
@@ -436,20 +461,52 @@ class GraphicUserInterface(QMainWindow):
         if param.orientation & 2:
             self.px = np.zeros((param.y), dtype=np.float64)
             self.py = np.zeros((param.x), dtype=np.float64)
-            self.image = np.zeros((param.x, param.y), dtype=np.uint32)
+            self.images = [
+                np.zeros((param.x, param.y), dtype=np.uint32) for i in (0, 1)
+            ]
         else:
             self.px = np.zeros((param.x), dtype=np.float64)
             self.py = np.zeros((param.y), dtype=np.float64)
-            self.image = np.zeros((param.y, param.x), dtype=np.uint32)
+            self.images = [
+                np.zeros((param.y, param.x), dtype=np.uint32) for i in (0, 1)
+            ]
+        # The ROI histogram, one bin per 16-bit pixel value, or per
+        # 2 ** (bits - 16) values for deeper cameras.
+        self.histogram = np.zeros(65536, dtype=np.uint32)
+        # The dark frame, in the layout of the binned camera frame, or None.
+        self.darkFrame = None
+        self.darkCapturing = False
+        # The flat field, in the layout of the binned camera frame, or None.
+        self.flatField = None
+        self.flatCapturing = False
+        # The bad pixels, an Nx2 array of their (x, y) sensor coordinates, or None.
+        self.badPixels = None
+        # The camera thread fills one of each pair while we display the other.
+        self.image = self.images[0]
         self.imageBuffer = pycaqtimage.pyCreateImageBuffer(
-            self.ui.display_image.image,
+            self.ui.display_image.images[0],
             self.px,
             self.py,
-            self.image,
+            self.images[0],
             param.x,
             param.y,
             param.orientation,
         )
+        pycaqtimage.pySetBackBuffer(
+            self.imageBuffer, self.ui.display_image.images[1], self.images[1]
+        )
+        self.ui.display_image.setImageData(self.images)
+        pycaqtimage.pySetDecimateMean(
+            self.imageBuffer, self.ui.actionDecimateMean.isChecked()
+        )
+        self.ui.display_image.setImageBuffer(self.imageBuffer)
+        pycaqtimage.pySetThreadCount(self.imageBuffer, self.nthreads)
+        pycaqtimage.pySetHistogram(self.imageBuffer, self.histogram)
+        self.setImageBufferDepth()
+        self.setImageBufferColorMap()
+        self.setImageBufferDark()
+        self.setImageBufferFlat()
+        self.setImageBufferBadPixels()
 
         self.updateRoiText()
 
@@ -494,6 +551,7 @@ class GraphicUserInterface(QMainWindow):
         self.ui.grayScale.stateChanged.connect(self.onCheckGrayUpdate)
         self.ui.grayScale.setVisible(False)
         self.ui.local_avg.toggled.connect(self.onCheckDisplayUpdate)
+        self.ui.ema_avg.toggled.connect(self.onCheckDisplayUpdate)
 
         self.ui.comboBoxColor.currentIndexChanged.connect(
             self.onComboBoxColorIndexChanged
@@ -549,6 +607,7 @@ class GraphicUserInterface(QMainWindow):
         self.ui.actionZoomIn.triggered.connect(self.onZoomIn)
         self.ui.actionZoomOut.triggered.connect(self.onZoomOut)
         self.ui.actionZoomReset.triggered.connect(self.onZoomReset)
+        self.ui.actionDecimateMean.triggered.connect(self.onDecimateMean)
 
         self.ui.actionReconnect.triggered.connect(self.on_reconnect)
         self.ui.actionForce.triggered.connect(self.on_force_disconnect)
@@ -572,7 +631,8 @@ class GraphicUserInterface(QMainWindow):
         self.cam_type_screen_generator = None
         self.setup_model_specific()
 
-        self.ui.average.returnPressed.connect(self.onAverageSet)
+        self.ui.average.returnPressed.connect(self.onAverageEnter)
+        self.ui.ema_frames.returnPressed.connect(self.onAverageEnter)
         self.ui.comboBoxOrientation.currentIndexChanged.connect(
             self.onOrientationSelect
         )
@@ -595,8 +655,21 @@ class GraphicUserInterface(QMainWindow):
             lambda: self.setOrientation(param.ORIENT270F)
         )
         self.setOrientation(param.ORIENT0)  # default to use unrotated
+        self.ui.bin1x1.triggered.connect(lambda: self.setBinning(1, 1))
+        self.ui.bin2x2.triggered.connect(lambda: self.setBinning(2, 2))
+        self.ui.bin4x4.triggered.connect(lambda: self.setBinning(4, 4))
+        self.setBinning(1, 1)
 
         self.ui.FileSave.triggered.connect(self.onfileSave)
+        self.ui.DarkCapture.triggered.connect(self.onDarkCapture)
+        self.ui.DarkSubtract.triggered.connect(self.setImageBufferDark)
+        self.ui.DarkClear.triggered.connect(self.onDarkClear)
+        self.ui.FlatCapture.triggered.connect(self.onFlatCapture)
+        self.ui.FlatCorrect.triggered.connect(self.setImageBufferFlat)
+        self.ui.FlatClear.triggered.connect(self.onFlatClear)
+        self.ui.BadPixelFind.triggered.connect(self.onBadPixelFind)
+        self.ui.BadPixelReplace.triggered.connect(self.setImageBufferBadPixels)
+        self.ui.BadPixelClear.triggered.connect(self.onBadPixelClear)
         self.retry_save_image.connect(self.onfileSave)
 
         self.imageUpdate.connect(self.onImageUpdate)
@@ -627,6 +700,7 @@ class GraphicUserInterface(QMainWindow):
         self.ui.radioGaussian.toggled.connect(self.onGenericConfigChange)
         self.ui.radioSG4.toggled.connect(self.onGenericConfigChange)
         self.ui.radioSG6.toggled.connect(self.onGenericConfigChange)
+        self.ui.checkBoxPreciseFit.stateChanged.connect(self.onGenericConfigChange)
         self.ui.checkBoxFits.stateChanged.connect(self.onCheckFitsUpdate)
         self.ui.lineEditCalib.returnPressed.connect(self.onCalibTextEnter)
         self.calib = 1.0
@@ -787,25 +861,51 @@ class GraphicUserInterface(QMainWindow):
     def setImageSize(self, newx, newy, reset=True):
         if newx == 0 or newy == 0:
             return
-        param.setImageSize(newx, newy)
+        # The image is the camera's newx x newy binned.
+        self.sensorSize = (newx, newy)
+        param.setImageSize(newx // param.binx, newy // param.biny)
         self.ui.display_image.setImageSize(reset)
         if param.orientation & 2:
             self.px = np.zeros((param.y), dtype=np.float64)
             self.py = np.zeros((param.x), dtype=np.float64)
-            self.image = np.zeros((param.x, param.y), dtype=np.uint32)
+            self.images = [
+                np.zeros((param.x, param.y), dtype=np.uint32) for i in (0, 1)
+            ]
         else:
             self.px = np.zeros((param.x), dtype=np.float64)
             self.py = np.zeros((param.y), dtype=np.float64)
-            self.image = np.zeros((param.y, param.x), dtype=np.uint32)
+            self.images = [
+                np.zeros((param.y, param.x), dtype=np.uint32) for i in (0, 1)
+            ]
+        # The camera thread fills one of each pair while we display the other.
+        self.image = self.images[0]
         self.imageBuffer = pycaqtimage.pyCreateImageBuffer(
-            self.ui.display_image.image,
+            self.ui.display_image.images[0],
             self.px,
             self.py,
-            self.image,
-            param.x,
-            param.y,
+            self.images[0],
+            newx,
+            newy,
             param.orientation,
+            param.binx,
+            param.biny,
         )
+        pycaqtimage.pySetBackBuffer(
+            self.imageBuffer, self.ui.display_image.images[1], self.images[1]
+        )
+        self.ui.display_image.setImageData(self.images)
+        pycaqtimage.pySetDecimateMean(
+            self.imageBuffer, self.ui.actionDecimateMean.isChecked()
+        )
+        self.ui.display_image.setImageBuffer(self.imageBuffer)
+        pycaqtimage.pySetThreadCount(self.imageBuffer, self.nthreads)
+        pycaqtimage.pySetHistogram(self.imageBuffer, self.histogram)
+        self.setImageBufferDepth()
+        self.setImageBufferColorMap()
+        self.setImageBufferDark()
+        self.setImageBufferFlat()
+        self.setImageBufferBadPixels()
+        self.onAverageSet()
         if self.camera is not None:
             if self.isColor:
                 self.camera.processor = pycaqtimage.pyCreateColorImagePvCallbackFunc(
@@ -821,6 +921,11 @@ class GraphicUserInterface(QMainWindow):
                 self.imageBuffer, self.ui.grayScale.isChecked()
             )
 
+    def pixelImage(self):
+        # The latest image as pixel values.  The image array is uint32, so for
+        # a float camera it holds the bits of the floats.
+        return self.image.view(np.float32) if self.isFloat else self.image
+
     def doShowProj(self):
         v = self.ui.showproj.isChecked()
         self.ui.projH.setVisible(v)
@@ -1045,17 +1150,21 @@ class GraphicUserInterface(QMainWindow):
         )
         self.averageCur = lValue[5]
         sMarkerInfoText = ""
-        if lValue[0] >= 0:
+        if lValue[0] is not None:
             pt = self.ui.display_image.cursorPos.oriented()
-            sMarkerInfoText += "(%d,%d): %-4d " % (pt.x(), pt.y(), lValue[0])
+            sMarkerInfoText += "(%d,%d): %-4s " % (
+                pt.x(),
+                pt.y(),
+                format_pixel(lValue[0]),
+            )
         for iMarker in range(4):
-            if lValue[iMarker + 1] >= 0:
+            if lValue[iMarker + 1] is not None:
                 pt = self.ui.display_image.lMarker[iMarker].oriented()
-                sMarkerInfoText += "%d:(%d,%d): %-4d " % (
+                sMarkerInfoText += "%d:(%d,%d): %-4s " % (
                     1 + iMarker,
                     pt.x(),
                     pt.y(),
-                    lValue[iMarker + 1],
+                    format_pixel(lValue[iMarker + 1]),
                 )
         # Sigh.  This is the longest label... if it is too long, the window will resize.
         # This would be bad, because the display_image minimum size is small... so we
@@ -1076,9 +1185,24 @@ class GraphicUserInterface(QMainWindow):
         pycaqtimage.pySetImageBufferGray(self.imageBuffer, newval)
         if self.isColor:
             self.set_color_scaling_enabled(newval)
+        self.updateCaptureActions()
         if self.cfg is None:
             self.dumpConfig()
 
+    def updateCaptureActions(self):
+        # Color frames shown in color skip the dark frame and flat field, so
+        # they can't capture them either.  Stop any capture that would never
+        # finish.
+        enabled = not self.isColor or self.ui.grayScale.isChecked()
+        self.ui.DarkCapture.setEnabled(enabled)
+        self.ui.FlatCapture.setEnabled(enabled)
+        if not enabled and self.darkCapturing:
+            self.darkCapturing = False
+            self.setImageBufferDark()
+        if not enabled and self.flatCapturing:
+            self.flatCapturing = False
+            self.setImageBufferFlat()
+
     def onCheckDisplayUpdate(self, newval):
         if not newval:
             return  # Only do this for the checked one!
@@ -1090,7 +1214,9 @@ class GraphicUserInterface(QMainWindow):
                 )
         elif self.ui.local_avg.isChecked():
             self.avgState = LOCAL_AVERAGE
-        self.onAverageSet()
+        elif self.ui.ema_avg.isChecked():
+            self.avgState = EXP_AVERAGE
+        self.onAverageEnter()
 
     def onCheckFitsUpdate(self):
         self.ui.groupBoxFits.setVisible(self.ui.checkBoxFits.isChecked())
@@ -1193,6 +1319,12 @@ class GraphicUserInterface(QMainWindow):
     def onZoomReset(self):
         self.ui.display_image.zoomReset()
 
+    def onDecimateMean(self):
+        pycaqtimage.pySetDecimateMean(
+            self.imageBuffer, self.ui.actionDecimateMean.isChecked()
+        )
+        self.ui.display_image.update()
+
     def hsv(self):
         self.colorMap = "hsv"
         self.setColorMap()
@@ -1213,16 +1345,223 @@ class GraphicUserInterface(QMainWindow):
         self.colorMap = "gray"
         self.setColorMap()
 
-    def setColorMap(self):
+    def setImageBufferDepth(self):
+        # The colormap ranges are up to maxcolor, so the histogram is too.
+        pycaqtimage.pySetPixelDepth(
+            self.imageBuffer, self.maxcolor.bit_length(), self.isFloat
+        )
+
+    def setImageBufferColorMap(self):
+        # Each image buffer has its own colormap, so a new one needs it set again.
         if self.colorMap != "gray":
-            fnColorMap = self.cwd + "/" + self.colorMap + ".txt"
-            pycaqtimage.pydspl_setup_color_map(
-                fnColorMap, self.iRangeMin, self.iRangeMax, self.iScaleIndex
+            fnColorMap = self.colormapFiles[self.colorMap]
+            pycaqtimage.pySetColorMap(
+                self.imageBuffer,
+                fnColorMap,
+                self.iRangeMin,
+                self.iRangeMax,
+                self.iScaleIndex,
             )
         else:
-            pycaqtimage.pydspl_setup_gray(
-                self.iRangeMin, self.iRangeMax, self.iScaleIndex
+            pycaqtimage.pySetGrayMap(
+                self.imageBuffer, self.iRangeMin, self.iRangeMax, self.iScaleIndex
             )
+
+    def binningSuffix(self):
+        # Dark frames and flat fields are binned, so each binning has its own.
+        if param.binx * param.biny == 1:
+            return ""
+        return ".bin%dx%d" % (param.binx, param.biny)
+
+    def darkFilename(self):
+        return self.cfgdir + self.cameraBase + self.binningSuffix() + ".dark.npy"
+
+    def setImageBufferDark(self):
+        # Each image buffer has its own dark frame too.
+        dark = self.darkFrame
+        if dark is not None and dark.shape != (param.y, param.x):
+            print(
+                "Dark frame is %dx%d, not %dx%d, ignoring it!"
+                % (dark.shape[1], dark.shape[0], param.x, param.y)
+            )
+            dark = None
+        if not self.ui.DarkSubtract.isChecked():
+            dark = None
+        pycaqtimage.pySetDark(self.imageBuffer, dark)
+
+    def onDarkCapture(self):
+        nframes, ok = QInputDialog.getInt(
+            self, "Capture Dark Frame", "Number of frames to average:", 10, 1, 16384
+        )
+        if ok:
+            # This cancels any flat field capture.
+            pycaqtimage.pyCaptureDark(self.imageBuffer, nframes)
+            self.darkCapturing = True
+            self.flatCapturing = False
+
+    def checkDarkCapture(self):
+        # The capture is done when the image buffer has a dark frame for us.
+        dark = pycaqtimage.pyGetDark(self.imageBuffer)
+        if dark is None:
+            return
+        self.darkCapturing = False
+        self.darkFrame = dark
+        self.ui.DarkSubtract.setChecked(True)
+        self.setImageBufferDark()
+        try:
+            np.save(self.darkFilename(), dark)
+        except OSError as e:
+            print("Error saving the dark frame: %s" % e)
+
+    def onDarkClear(self):
+        self.darkCapturing = False
+        self.darkFrame = None
+        self.ui.DarkSubtract.setChecked(False)
+        self.setImageBufferDark()
+        try:
+            os.unlink(self.darkFilename())
+        except OSError:
+            pass
+
+    def loadDark(self):
+        # There may well not be a dark frame for this camera.
+        self.darkCapturing = False
+        try:
+            self.darkFrame = np.ascontiguousarray(
+                np.load(self.darkFilename()), dtype=np.uint32
+            )
+        except Exception:
+            self.darkFrame = None
+        self.ui.DarkSubtract.setChecked(self.darkFrame is not None)
+        self.setImageBufferDark()
+
+    def flatFilename(self):
+        return self.cfgdir + self.cameraBase + self.binningSuffix() + ".flat.npy"
+
+    def setImageBufferFlat(self):
+        flat = self.flatField
+        if flat is not None and flat.shape != (param.y, param.x):
+            print(
+                "Flat field is %dx%d, not %dx%d, ignoring it!"
+                % (flat.shape[1], flat.shape[0], param.x, param.y)
+            )
+            flat = None
+        if not self.ui.FlatCorrect.isChecked():
+            flat = None
+        pycaqtimage.pySetFlat(self.imageBuffer, flat)
+
+    def onFlatCapture(self):
+        nframes, ok = QInputDialog.getInt(
+            self, "Capture Flat Field", "Number of frames to average:", 10, 1, 16384
+        )
+        if ok:
+            # This cancels any dark frame capture.
+            pycaqtimage.pyCaptureFlat(self.imageBuffer, nframes)
+            self.flatCapturing = True
+            self.darkCapturing = False
+
+    def checkFlatCapture(self):
+        # The capture is done when the image buffer has a flat field for us.
+        flat = pycaqtimage.pyGetFlat(self.imageBuffer)
+        if flat is None:
+            return
+        self.flatCapturing = False
+        self.flatField = flat
+        self.ui.FlatCorrect.setChecked(True)
+        self.setImageBufferFlat()
+        try:
+            np.save(self.flatFilename(), flat)
+        except OSError as e:
+            print("Error saving the flat field: %s" % e)
+
+    def onFlatClear(self):
+        self.flatCapturing = False
+        self.flatField = None
+        self.ui.FlatCorrect.setChecked(False)
+        self.setImageBufferFlat()
+        try:
+            os.unlink(self.flatFilename())
+        except OSError:
+            pass
+
+    def loadFlat(self):
+        # There may well not be a flat field for this camera.
+        self.flatCapturing = False
+        try:
+            self.flatField = np.ascontiguousarray(
+                np.load(self.flatFilename()), dtype=np.float32
+            )
+        except Exception:
+            self.flatField = None
+        self.ui.FlatCorrect.setChecked(self.flatField is not None)
+        self.setImageBufferFlat()
+
+    def badPixelFilename(self):
+        return self.cfgdir + self.cameraBase + ".badpixels.txt"
+
+    def setImageBufferBadPixels(self):
+        pixels = self.badPixels
+        if not self.ui.BadPixelReplace.isChecked():
+            pixels = None
+        pycaqtimage.pySetBadPixels(self.imageBuffer, pixels)
+
+    def saveBadPixels(self):
+        # One "x y" line per pixel, so the list can be edited by hand too.
+        try:
+            np.savetxt(self.badPixelFilename(), self.badPixels, fmt="%d")
+        except OSError as e:
+            print("Error saving the bad pixels: %s" % e)
+
+    def onBadPixelFind(self):
+        # Hot pixels stand out of the dark frame by more than nsigma robust
+        # standard deviations.  They're added to any we already have.
+        dark = self.darkFrame
+        if dark is None or param.binx * param.biny != 1:
+            QMessageBox.warning(
+                self,
+                "Find Bad Pixels",
+                "Bad pixels are found in a dark frame captured without binning.",
+            )
+            return
+        nsigma, ok = QInputDialog.getDouble(
+            self, "Find Bad Pixels", "Standard deviations above the median:", 8, 1, 1000
+        )
+        if not ok:
+            return
+        median = np.median(dark)
+        sigma = 1.4826 * np.median(np.abs(dark - median))
+        hot = np.argwhere(dark > median + max(nsigma * sigma, 1))[:, ::-1]
+        if self.badPixels is not None:
+            hot = np.concatenate((self.badPixels, hot))
+        self.badPixels = np.ascontiguousarray(np.unique(hot, axis=0), dtype=np.int32)
+        print("%d bad pixels" % len(self.badPixels))
+        self.ui.BadPixelReplace.setChecked(True)
+        self.setImageBufferBadPixels()
+        self.saveBadPixels()
+
+    def onBadPixelClear(self):
+        self.badPixels = None
+        self.ui.BadPixelReplace.setChecked(False)
+        self.setImageBufferBadPixels()
+        try:
+            os.unlink(self.badPixelFilename())
+        except OSError:
+            pass
+
+    def loadBadPixels(self):
+        # There may well not be a bad pixel list for this camera.
+        try:
+            self.badPixels = np.ascontiguousarray(
+                np.loadtxt(self.badPixelFilename(), ndmin=2).reshape(-1, 2),
+                dtype=np.int32,
+            )
+        except Exception:
+            self.badPixels = None
+        self.ui.BadPixelReplace.setChecked(self.badPixels is not None)
+        self.setImageBufferBadPixels()
+
+    def setColorMap(self):
+        self.setImageBufferColorMap()
         # If the image isn't frozen, this isn't really necessary.  But it bothers me when it *is*
         # frozen!
         pycaqtimage.pyRecolorImageBuffer(self.imageBuffer)
@@ -1282,11 +1621,14 @@ class GraphicUserInterface(QMainWindow):
             file_ext = os.path.splitext(filename)[1]
             if file_ext == ".npy":
                 # This either works or raises an OSError such as PermissionError
-                np.save(filename, self.image)
+                np.save(filename, self.pixelImage())
                 return self.show_file_success(filename=filename, file_ext=file_ext)
+            # Only the part of the image on the screen is colored, so color it all.
+            self.ui.display_image.setViewport(full=True)
             save_ok = self.ui.display_image.image.save(
                 filename, format=None, quality=-1
             )
+            self.ui.display_image.setViewport()
             if save_ok:
                 # QImage.save returned True, so the save succeeded.
                 return self.show_file_success(filename=filename, file_ext=file_ext)
@@ -1375,10 +1717,23 @@ class GraphicUserInterface(QMainWindow):
             except Exception:
                 self.average = 1
                 self.ui.average.setText("1")
-            pycaqtimage.pySetFrameAverage(self.average, self.imageBuffer)
+            pycaqtimage.pySetSlidingAverage(self.average, self.imageBuffer)
+        elif self.avgState == EXP_AVERAGE:
+            try:
+                self.emaFrames = max(float(self.ui.ema_frames.text()), 1.0)
+            except Exception:
+                self.emaFrames = 10.0
+            self.ui.ema_frames.setText("%g" % self.emaFrames)
+            self.updateMiscInfo()
+            pycaqtimage.pySetExpAverage(1.0 / self.emaFrames, self.imageBuffer)
         else:
             pycaqtimage.pySetFrameAverage(1, self.imageBuffer)
 
+    def onAverageEnter(self):
+        self.onAverageSet()
+        if self.cfg is None:
+            self.dumpConfig()
+
     def onCalibTextEnter(self):
         try:
             self.calib = float(self.ui.lineEditCalib.text())
@@ -1400,11 +1755,47 @@ class GraphicUserInterface(QMainWindow):
         try:
             newx = self.colPv.value
             newy = self.rowPv.value
-            if newx != param.x or newy != self.y:
+            if (newx, newy) != self.sensorSize:
                 self.setImageSize(newx, newy, False)
         except Exception:
             pass
 
+    def setMaxColor(self):
+        # Binned pixels are the sum of binx * biny camera pixels.
+        self.maxcolor = (2**self.bits - 1) * param.binx * param.biny
+        if self.isColor:
+            self.maxcolor *= 3
+        # The range sliders and spinboxes only go up to a signed int.
+        self.maxcolor = min(self.maxcolor, 2**31 - 1)
+
+        self.ui.horizontalSliderRangeMin.setMaximum(self.maxcolor)
+        self.ui.horizontalSliderRangeMin.setTickInterval(self.maxcolor // 4)
+        self.ui.horizontalSliderRangeMax.setMaximum(self.maxcolor)
+        self.ui.horizontalSliderRangeMax.setTickInterval(self.maxcolor // 4)
+        self.ui.spinbox_range_max.setMaximum(self.maxcolor)
+        self.ui.spinbox_range_min.setMaximum(self.maxcolor)
+
+    def setBinning(self, binx, biny):
+        self.ui.bin1x1.setChecked((binx, biny) == (1, 1))
+        self.ui.bin2x2.setChecked((binx, biny) == (2, 2))
+        self.ui.bin4x4.setChecked((binx, biny) == (4, 4))
+        if (binx, biny) == (param.binx, param.biny):
+            return
+        param.setBinning(binx, biny)
+        self.setMaxColor()
+        # The dark frame and flat field don't fit the new binning; it has its own.
+        self.darkFrame = None
+        self.flatField = None
+        # Markers, ROI and zoom are in sensor pixels, so they stay put.
+        self.setImageSize(self.sensorSize[0], self.sensorSize[1], False)
+        self.loadDark()
+        self.loadFlat()
+        self.updateMarkerText(True, True, 0, 15)
+        self.updateRoiText()
+        self.updateall()
+        if self.cfg is None:
+            self.dumpConfig()
+
     def user_set_max_image_rate(self, rate: int) -> None:
         """
         Call set_max_image_rate and record the value as the desired rate.
@@ -1512,6 +1903,14 @@ class GraphicUserInterface(QMainWindow):
         if not self.camera:
             return
         try:
+            # Take the latest complete frame from the camera thread.
+            front, direct = pycaqtimage.pySwapBuffers(self.imageBuffer)
+            self.image = self.images[front]
+            self.ui.display_image.setFrontImage(front, direct)
+            if self.darkCapturing:
+                self.checkDarkCapture()
+            if self.flatCapturing:
+                self.checkFlatCapture()
             self.dispUpdates += 1
             self.updateMarkerValue()
             self.updateMiscInfo()
@@ -1555,8 +1954,9 @@ class GraphicUserInterface(QMainWindow):
                 projXmin, projXmax, projYmin, projYmax
             )
             if self.ui.checkbox_auto_range.isChecked():
-                self.set_new_max_pixel(self.max_px)
-                self.set_new_min_pixel(self.min_px)
+                auto_min, auto_max = self.get_auto_range()
+                self.set_new_max_pixel(auto_max)
+                self.set_new_min_pixel(auto_min)
             if roiMean == 0:
                 roiVarByMean = 0
             else:
@@ -1567,12 +1967,31 @@ class GraphicUserInterface(QMainWindow):
                     f"ROI Mean {roiMean:<-7.2f} "
                     f"Std {math.sqrt(roiVar):<-7.2f} "
                     f"Var/Mean {roiVarByMean:<-7.2f} "
-                    f"Min {self.min_px:<4d} "
-                    f"Max {self.max_px:<4d} "
+                    f"Min {format_pixel(self.min_px):<4s} "
+                    f"Max {format_pixel(self.max_px):<4s} "
                     f"({roi.x()},{roi.y()}) "
                     f"W {roi.width()} H {roi.height()}"
                 )
             )
+            (
+                cx,
+                cy,
+                sigmaX,
+                sigmaY,
+                sigmaXY,
+                d4SigmaX,
+                d4SigmaY,
+                angle,
+            ) = pycaqtimage.pyGetRoiMoments(self.imageBuffer)
+            self.ui.labelMomentInfo.setText(
+                (
+                    f"Centroid ({cx:.1f},{cy:.1f}) "
+                    f"Sigma {sigmaX:.2f} {sigmaY:.2f} "
+                    f"Cov {sigmaXY:.2f} "
+                    f"D4Sigma {d4SigmaX:.1f} x {d4SigmaY:.1f} "
+                    f"@ {math.degrees(angle):.1f} deg"
+                )
+            )
             self.ui.labelProjHmax.setText("%d -" % projXmax)
             self.ui.labelProjMin.setText("%d\n%d\\" % (projXmin, projYmin))
             self.ui.labelProjVmax.setText("| %d" % projYmax)
@@ -1591,6 +2010,11 @@ class GraphicUserInterface(QMainWindow):
                     param.zoom,
                 )
             )
+        elif self.avgState == EXP_AVERAGE:
+            self.ui.labelMiscInfo.setText(
+                "ExpAvg %g shots Color scale [%d,%d] Zoom %.3f"
+                % (self.emaFrames, self.iRangeMin, self.iRangeMax, param.zoom)
+            )
         else:
             self.ui.labelMiscInfo.setText(
                 "AvgShot# %d/%d Color scale [%d,%d] Zoom %.3f"
@@ -2027,20 +2451,11 @@ class GraphicUserInterface(QMainWindow):
                 self.bits = 12
                 print("Bits PV did not connect or had bad value, using default 12")
 
-        # Ensure positive bit depth no bigger than 16
-        # Negative bit depth and large bit depths both break the app
-        self.bits = min(max(1, self.bits), 16)
-        self.maxcolor = 2**self.bits - 1
-        if self.isColor:
-            self.maxcolor *= 3
-            self.maxcolor = min(self.maxcolor, 2**16 - 1)
-
-        self.ui.horizontalSliderRangeMin.setMaximum(self.maxcolor)
-        self.ui.horizontalSliderRangeMin.setTickInterval(self.maxcolor // 4)
-        self.ui.horizontalSliderRangeMax.setMaximum(self.maxcolor)
-        self.ui.horizontalSliderRangeMax.setTickInterval(self.maxcolor // 4)
-        self.ui.spinbox_range_max.setMaximum(self.maxcolor)
-        self.ui.spinbox_range_min.setMaximum(self.maxcolor)
+        # Ensure positive bit depth no bigger than the callback can take.
+        # Negative bit depth and large bit depths both break the app.
+        # Beyond 16 bits, the pixel values are scaled to fit the colormap.
+        self.bits = min(max(1, self.bits), 16 if self.isColor else 32)
+        self.setMaxColor()
 
         # Try to connect to the camera
         self.camera = self.connectPv(sCameraPv, count=self.count)
@@ -2049,6 +2464,11 @@ class GraphicUserInterface(QMainWindow):
             print("IOC timeout in setup (main camera PV)")
             return
 
+        # 4 byte pixels can be float32 as well as uint32: ask the channel
+        # for its field type rather than guess from the first value.
+        self.isFloat = self.camera.type().endswith("_FLOAT")
+        self.setImageBufferDepth()
+
         if sNotifyPv is None:
             self.notify = self.connectPv(sCameraPv, count=1)
         else:
@@ -2067,6 +2487,7 @@ class GraphicUserInterface(QMainWindow):
             )
             self.set_color_scaling_enabled(True)
             self.ui.grayScale.setVisible(False)
+        self.updateCaptureActions()
         self.notify.add_monitor_callback(self.haveImageCallback)
         self.camera.getevt_cb = self.imagePvUpdateCallback
         self.rowPv.add_monitor_callback(self.sizeCallback)
@@ -2267,12 +2688,13 @@ class GraphicUserInterface(QMainWindow):
         sLensPv = self.lLensList[index]
         sEvrPv = self.lEvrList[index]
 
-        self.connectCamera(sCameraPv + ":ArrayData", index)
-
+        # Before connecting, so the camera config can choose the averaging.
         self.avgState = SINGLE_FRAME
         self.ui.singleframe.setChecked(True)
         self.average = 1
 
+        self.connectCamera(sCameraPv + ":ArrayData", index)
+
         sLensPvDesc = sLensPv if sLensPv != "" else "None"
         print(
             "Using Camera [%d] Pv %s Evr %s LensPv %s"
@@ -2738,8 +3160,9 @@ class GraphicUserInterface(QMainWindow):
         Apply an automatic pixel range to the image and rerender.
 
         This takes the current maximum and minimum pixel values
-        from the last collected image and sets them as the maximum
-        and minimum pixel thresholds for the colormap.
+        (or percentiles, see get_auto_range) from the last collected
+        image and sets them as the maximum and minimum pixel thresholds
+        for the colormap.
 
         This is intended to be called as a slot from signals emitted
         from clicking a QPushButton or from checking a QCheckbox.
@@ -2753,10 +3176,36 @@ class GraphicUserInterface(QMainWindow):
         for the next frame.
         """
         if checked in (None, Qt.Checked):
-            self.set_new_max_pixel(self.max_px)
-            self.set_new_min_pixel(self.min_px)
+            auto_min, auto_max = self.get_auto_range()
+            self.set_new_max_pixel(auto_max)
+            self.set_new_min_pixel(auto_min)
             self.after_new_min_or_max_pixel()
 
+    def get_auto_range(self) -> tuple[int, int]:
+        """
+        Get the pixel range to auto scale to, as (min, max).
+
+        This is either the minimum and maximum pixel values of the ROI,
+        or the percentiles picked in comboBoxAutoRange, so that a few
+        hot or dead pixels don't set the scale.  The percentiles come
+        from the cumulative ROI histogram that pyUpdateProj fills in.
+        """
+        percentiles = AUTO_RANGE_PERCENTILES[self.ui.comboBoxAutoRange.currentIndex()]
+        # Float cameras have float min and max pixels.
+        pixel_range = math.floor(self.min_px), math.ceil(self.max_px)
+        if percentiles is None:
+            return pixel_range
+        cumulative = np.cumsum(self.histogram, dtype=np.uint64)
+        total = int(cumulative[-1])
+        if total == 0:
+            return pixel_range
+        low, high = np.searchsorted(
+            cumulative, [total * percentiles[0] / 100, total * percentiles[1] / 100]
+        )
+        # Deeper than 16 bits, each bin is a range of pixel values.
+        shift = max(self.maxcolor.bit_length() - 16, 0)
+        return int(low) << shift, min(((int(high) + 1) << shift) - 1, self.maxcolor)
+
     def set_color_scaling_enabled(self, enabled: bool):
         """
         Set the color scaling to enabled or disabled.
@@ -2775,6 +3224,7 @@ class GraphicUserInterface(QMainWindow):
         self.ui.spinbox_range_min.setEnabled(enabled)
         self.ui.spinbox_range_max.setEnabled(enabled)
         self.ui.checkbox_auto_range.setEnabled(enabled)
+        self.ui.comboBoxAutoRange.setEnabled(enabled)
         self.ui.pushbutton_auto_range.setEnabled(enabled)
         if not enabled:
             self.ui.checkbox_auto_range.setChecked(False)
@@ -3118,6 +3568,15 @@ class GraphicUserInterface(QMainWindow):
             orientation = param.ORIENT0
         self.setOrientation(int(orientation))
 
+        # binning may be missing if there was no camera config
+        try:
+            binx, biny = int(self.cfg.binning[0]), int(self.cfg.binning[1])
+        except Exception:
+            # The full resolution image is a sensible default.
+            binx, biny = 1, 1
+        finally:
+            self.setBinning(binx, biny)
+
         # autorange may be missing if there was no camera config
         try:
             autorange = int(self.cfg.autorange)
@@ -3210,7 +3669,51 @@ class GraphicUserInterface(QMainWindow):
             self.ui.grayScale.setChecked(grayscale)
             self.onCheckGrayUpdate(grayscale)
 
+        # colorauto may be missing if there was no camera config
+        try:
+            colorauto = int(self.cfg.colorauto)
+        except Exception:
+            # Same default as the combobox in the UI file
+            colorauto = 0
+        finally:
+            self.ui.comboBoxAutoRange.setCurrentIndex(colorauto)
+
+        # average may be missing if there was no camera config
+        try:
+            average = int(self.cfg.average)
+        except Exception:
+            # Same default as the line edit in the UI file
+            average = 1
+        finally:
+            self.ui.average.setText(str(average))
+
+        # emaframes may be missing if there was no camera config
+        try:
+            emaframes = float(self.cfg.emaframes)
+        except Exception:
+            # Same default as the line edit in the UI file
+            emaframes = 10.0
+        finally:
+            self.ui.ema_frames.setText("%g" % emaframes)
+
+        # avgmode may be missing if there was no camera config
+        try:
+            avgmode = int(self.cfg.avgmode)
+        except Exception:
+            # Averaging is off unless asked for
+            avgmode = SINGLE_FRAME
+        finally:
+            if avgmode == LOCAL_AVERAGE:
+                self.ui.local_avg.setChecked(True)
+            elif avgmode == EXP_AVERAGE:
+                self.ui.ema_avg.setChecked(True)
+            else:
+                self.ui.singleframe.setChecked(True)
+
         self.setColorMap()
+        self.loadDark()
+        self.loadFlat()
+        self.loadBadPixels()
 
         # Reset markers
         reset_markers(self.local_marker_points)
@@ -3289,6 +3792,10 @@ class GraphicUserInterface(QMainWindow):
             self.ui.checkBoxConstant.setChecked(self.cfg.projconstant == "1")
         except Exception:
             pass
+        try:
+            self.ui.checkBoxPreciseFit.setChecked(self.cfg.projprecise == "1")
+        except Exception:
+            pass
         try:
             if (
                 self.cfg.projdisplayFormat[0] == '"'
@@ -3310,6 +3817,7 @@ def write_camera_config(gui: GraphicUserInterface) -> None:
         fd.write("viewheight  " + str(gui.viewheight) + "\n")
         fd.write("portrait    " + str(int(param.orientation == param.ORIENT90)) + "\n")
         fd.write("orientation " + str(param.orientation) + "\n")
+        fd.write(f"binning     {param.binx} {param.biny}\n")
         fd.write(
             "autorange   " + str(int(gui.ui.checkBoxProjAutoRange.isChecked())) + "\n"
         )
@@ -3331,6 +3839,10 @@ def write_camera_config(gui: GraphicUserInterface) -> None:
         fd.write(f"colormin    {gui.ui.spinbox_range_min.value()}\n")
         fd.write(f"colormax    {gui.ui.spinbox_range_max.value()}\n")
         fd.write("grayscale   " + str(int(gui.ui.grayScale.isChecked())) + "\n")
+        fd.write(f"colorauto   {gui.ui.comboBoxAutoRange.currentIndex()}\n")
+        fd.write(f"avgmode     {gui.avgState}\n")
+        fd.write(f"average     {gui.average}\n")
+        fd.write(f"emaframes   {gui.emaFrames:g}\n")
         roi = gui.ui.display_image.rectRoi.abs()
         fd.write(
             "ROI         %d %d %d %d\n" % (roi.x(), roi.y(), roi.width(), roi.height())
@@ -3365,6 +3877,9 @@ def write_camera_config(gui: GraphicUserInterface) -> None:
             + "\n"
         )
         fd.write("projconstant " + str(int(gui.ui.checkBoxConstant.isChecked())) + "\n")
+        fd.write(
+            "projprecise " + str(int(gui.ui.checkBoxPreciseFit.isChecked())) + "\n"
+        )
         fd.write("projcalib   %g\n" % gui.calib)
         fd.write('projcalibPV "%s"\n' % gui.calibPVName)
         fd.write('projdisplayFormat "%s"\n' % gui.displayFormat)
@@ -3399,6 +3914,13 @@ def atomic_writer(path: str) -> typing.Iterator[typing.TextIO]:
         os.remove(fd.name)
 
 
+def format_pixel(value: int | float) -> str:
+    """A pixel value for the labels: floats to 6 significant digits."""
+    if isinstance(value, float):
+        return "%.6g" % value
+    return "%d" % value
+
+
 def decode_char_waveform(waveform: npt.NDArray[np.int8]) -> str:
     """
     Convert an epics char waveform to a string.
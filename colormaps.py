@@ -0,0 +1,116 @@
+"""
+Colormap generation for pycaqtimage.
+
+Each colormap is a piecewise linear interpolation between knots of
+(position, red, green, blue), with everything in [0, 1].  The tables are
+written in the binary format pycaqtimage maps into memory: 65536 little endian
+uint32 0xAARRGGBB values, one per 16-bit pixel value, 256 KiB in all.
+
+To add a colormap, add its knots to KNOTS (and its name to comboBoxColor).
+"""
+import os
+import tempfile
+
+import numpy as np
+
+LUT_SIZE = 65536
+LUT_SUFFIX = ".lut"
+
+KNOTS = {
+    "jet": [
+        (0.000, 0.0, 0.0, 0.5),
+        (1 / 8, 0.0, 0.0, 1.0),
+        (2 / 8, 0.0, 0.5, 1.0),
+        (3 / 8, 0.0, 1.0, 1.0),
+        (4 / 8, 0.5, 1.0, 0.5),
+        (5 / 8, 1.0, 1.0, 0.0),
+        (6 / 8, 1.0, 0.5, 0.0),
+        (7 / 8, 1.0, 0.0, 0.0),
+        (1.000, 0.5, 0.0, 0.0),
+    ],
+    "cool": [
+        (0.000, 0.0, 1.0, 1.0),
+        (1.000, 1.0, 0.0, 1.0),
+    ],
+    "hot": [
+        (0.000, 0.0, 0.0, 0.0),
+        (1 / 3, 1.0, 0.0, 0.0),
+        (2 / 3, 1.0, 1.0, 0.0),
+        (1.000, 1.0, 1.0, 1.0),
+    ],
+    "hsv": [
+        (0.000, 1.0, 0.0, 0.0),
+        (1 / 6, 1.0, 1.0, 0.0),
+        (2 / 6, 0.0, 1.0, 0.0),
+        (3 / 6, 0.0, 1.0, 1.0),
+        (4 / 6, 0.0, 0.0, 1.0),
+        (5 / 6, 1.0, 0.0, 1.0),
+        (1.000, 1.0, 0.0, 0.0),
+    ],
+}
+
+
+def make_colormap(knots):
+    """Interpolate knots into a LUT_SIZE table of ARGB uint32 values."""
+    knots = np.asarray(knots, dtype=np.float64)
+    f = np.arange(LUT_SIZE, dtype=np.float64) / (LUT_SIZE - 1)
+    lut = np.full(LUT_SIZE, 0xFF000000, dtype=np.uint32)
+    for channel, shift in ((1, 16), (2, 8), (3, 0)):
+        value = _as_text_float(np.interp(f, knots[:, 0], knots[:, channel]))
+        lut |= (value * np.float32(255)).astype(np.uint32) << np.uint32(shift)
+    return lut
+
+
+def _as_text_float(value):
+    """
+    value as the old text colormaps held it: printed to 8 significant digits
+    by palette.c and read back as a float.  Truncating these, rather than the
+    doubles, keeps the tables the same as the ones read from the text files.
+    """
+    exponent = np.floor(np.log10(np.where(value > 0, value, 1)))
+    scale = 10.0 ** (7 - exponent)
+    return (np.round(value * scale) / scale).astype(np.float32)
+
+
+def write_colormap(filename, lut):
+    """Atomically write lut, so a viewer with the old file mapped keeps it."""
+    directory = os.path.dirname(filename)
+    fd, tmpname = tempfile.mkstemp(dir=directory, suffix=LUT_SUFFIX)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(lut.astype("<u4").tobytes())
+        os.chmod(tmpname, 0o644)
+        os.replace(tmpname, filename)
+    except Exception:
+        os.unlink(tmpname)
+        raise
+
+
+def colormap_is_current(filename, lut):
+    """Whether filename already holds lut, so it needn't be rewritten."""
+    data = lut.astype("<u4").tobytes()
+    try:
+        if os.path.getsize(filename) != len(data):
+            return False
+        with open(filename, "rb") as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+
+def install_colormaps(directory):
+    """
+    Generate all of the colormaps into directory, creating it if need be.
+    Only the files that are missing or differ from the knots are written, so
+    viewers sharing the directory don't keep replacing each other's files.
+    Returns a dictionary mapping the colormap name to its file.
+    """
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    for name, knots in KNOTS.items():
+        filename = os.path.join(directory, name + LUT_SUFFIX)
+        lut = make_colormap(knots)
+        if not colormap_is_current(filename, lut):
+            write_colormap(filename, lut)
+        files[name] = filename
+    return files
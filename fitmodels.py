@@ -0,0 +1,198 @@
+"""
+The lmfit models of the projections, for the precise fits.
+
+These are kept apart from ProjWidget because importing lmfit also imports
+matplotlib, which is slow, and neither is needed until the first such fit.
+"""
+from lmfit.models import (  # noqa: F401, ProjWidget uses GaussianModel from here.
+    GaussianModel,
+    Model,
+    update_param_vals,
+    guess_from_peak,
+    fwhm_expr,
+    height_expr,
+)
+import numpy as np
+
+# From lmfit.lineshapes, because it's not worth importing...
+#
+s2pi = np.sqrt(2 * np.pi)
+# tiny had been numpy.finfo(numpy.float64).eps ~=2.2e16.
+# here, we explicitly set it to 1.e-15 == numpy.finfo(numpy.float64).resolution
+tiny = 1.0e-15
+
+
+def gaussian_with_base(x, amplitude=1.0, center=0.0, sigma=1.0, base=0.0):
+    return base + (
+        (amplitude / (max(tiny, s2pi * sigma)))
+        * np.exp(-((1.0 * x - center) ** 2) / max(tiny, (2 * sigma**2)))
+    )
+
+
+def sg4(x, amplitude=1.0, center=0.0, width=1.0):
+    return amplitude * np.exp(-2.0 * ((x - center) ** 4 / max(tiny, width**4)))
+
+
+def sg4_with_base(x, amplitude=1.0, center=0.0, width=1.0, base=0.0):
+    return base + amplitude * np.exp(-2.0 * ((x - center) ** 4 / max(tiny, width**4)))
+
+
+def sg6(x, amplitude=1.0, center=0.0, width=1.0):
+    return amplitude * np.exp(-2.0 * ((x - center) ** 6 / max(tiny, width**6)))
+
+
+def sg6_with_base(x, amplitude=1.0, center=0.0, width=1.0, base=0.0):
+    return base + amplitude * np.exp(-2.0 * ((x - center) ** 6 / max(tiny, width**6)))
+
+
+# A shameless copy from lmfit.
+class GaussianModelWithBase(Model):
+    r"""A model based on a Gaussian or normal distribution lineshape.
+
+    The model has three Parameters: `amplitude`, `center`, and `sigma`.
+    In addition, parameters `fwhm` and `height` are included as
+    constraints to report full width at half maximum and maximum peak
+    height, respectively.
+
+    .. math::
+
+        f(x; A, \mu, \sigma) = \frac{A}{\sigma\sqrt{2\pi}} e^{[{-{(x-\mu)^2}/{{2\sigma}^2}}]}
+
+    where the parameter `amplitude` corresponds to :math:`A`, `center` to
+    :math:`\mu`, and `sigma` to :math:`\sigma`. The full width at half
+    maximum is :math:`2\sigma\sqrt{2\ln{2}}`, approximately
+    :math:`2.3548\sigma`.
+
+    For more information, see: https://en.wikipedia.org/wiki/Normal_distribution
+
+    """
+
+    fwhm_factor = 2 * np.sqrt(2 * np.log(2))
+    height_factor = 1.0 / np.sqrt(2 * np.pi)
+
+    def __init__(self, independent_vars=["x"], prefix="", nan_policy="raise", **kwargs):
+        kwargs.update(
+            {
+                "prefix": prefix,
+                "nan_policy": nan_policy,
+                "independent_vars": independent_vars,
+            }
+        )
+        super().__init__(gaussian_with_base, **kwargs)
+        self._set_paramhints_prefix()
+
+    def _set_paramhints_prefix(self):
+        self.set_param_hint("sigma", min=0)
+        self.set_param_hint("fwhm", expr=fwhm_expr(self))
+        self.set_param_hint("height", expr=height_expr(self))
+
+    def guess(self, data, x, negative=False, **kwargs):
+        """Estimate initial model parameter values from data."""
+        pars = guess_from_peak(self, data, x, negative)
+        return update_param_vals(pars, self.prefix, **kwargs)
+
+
+class SG4Model(Model):
+    r"""A model based on a SuperGaussian model with p == 4.
+
+    The model has three Parameters: `amplitude`, `center`, and `width`.
+    In addition, parameters `fwhm` and `e2w` are also reported as
+    constraints to report full width at half maximum and 1/e^2 width,
+    respectively.
+
+    .. math::
+
+        f(x; A, c, w, p) = A*e^{-2((x-c)/w)^p}
+
+    where `amplitude` is :math:`A`, `center` is :math:`c`, and `width`
+    is :math:`w`. p is a constant 4.
+    """
+
+    def __init__(
+        self, with_base, independent_vars=["x"], prefix="", nan_policy="raise", **kwargs
+    ):
+        kwargs.update(
+            {
+                "prefix": prefix,
+                "nan_policy": nan_policy,
+                "independent_vars": independent_vars,
+            }
+        )
+        self.with_base = with_base
+        if self.with_base:
+            super().__init__(sg4_with_base, **kwargs)
+        else:
+            super().__init__(sg4, **kwargs)
+        self._set_paramhints_prefix()
+
+    def _set_paramhints_prefix(self):
+        self.set_param_hint("width", min=0)
+        self.set_param_hint("fwhm", expr="1.5345*width")
+        self.set_param_hint("e2w", expr="2*width")
+
+    def guess(self, data, x, negative=False, **kwargs):
+        """Estimate initial model parameter values from data."""
+        maxy, miny = max(data), min(data)
+        maxx, minx = max(x), min(x)
+        cen = x[np.argmax(data)]
+        height = (maxy - miny) * 3.0
+        sig = (maxx - minx) / 6.0
+        if self.with_base:
+            pars = self.make_params(amplitude=height, center=cen, width=sig, base=0)
+        else:
+            pars = self.make_params(amplitude=height, center=cen, width=sig)
+        pars[f"{self.prefix}width"].set(min=0.0)
+        return update_param_vals(pars, self.prefix, **kwargs)
+
+
+class SG6Model(Model):
+    r"""A model based on a SuperGaussian model with p == 6.
+
+    The model has three Parameters: `amplitude`, `center`, and `width`.
+    In addition, parameters `fwhm` and `e2w` are also reported as
+    constraints to report full width at half maximum and 1/e^2 width,
+    respectively.
+
+    .. math::
+
+        f(x; A, c, w, p) = A*e^{-2((x-c)/w)^p}
+
+    where `amplitude` is :math:`A`, `center` is :math:`c`, and `width`
+    is :math:`w`. p is a constant 6.
+    """
+
+    def __init__(
+        self, with_base, independent_vars=["x"], prefix="", nan_policy="raise", **kwargs
+    ):
+        kwargs.update(
+            {
+                "prefix": prefix,
+                "nan_policy": nan_policy,
+                "independent_vars": independent_vars,
+            }
+        )
+        self.with_base = with_base
+        if self.with_base:
+            super().__init__(sg6_with_base, **kwargs)
+        else:
+            super().__init__(sg6, **kwargs)
+        self._set_paramhints_prefix()
+
+    def _set_paramhints_prefix(self):
+        self.set_param_hint("width", min=0)
+        self.set_param_hint("fwhm", expr="1.6762*width")
+        self.set_param_hint("e2w", expr="2*width")
+
+    def guess(self, data, x, negative=False, **kwargs):
+        """Estimate initial model parameter values from data."""
+        maxy, miny = max(data), min(data)
+        maxx, minx = max(x), min(x)
+        cen = x[np.argmax(data)]
+        height = (maxy - miny) * 3.0
+        sig = (maxx - minx) / 6.0
+        if self.with_base:
+            pars = self.make_params(amplitude=height, center=cen, width=sig, base=0)
+        else:
+            pars = self.make_params(amplitude=height, center=cen, width=sig)
+        pars[f"{self.prefix}width"].set(min=0.0)
+        return update_param_vals(pars, self.prefix, **kwargs)
@@ -47,6 +47,11 @@ y_rev = np.arange(y - 1, -1, -1)
 projsize = 300
 zoom = 1.0
 
+# The camera image is binned by binx x biny, so the image is that much smaller
+# than the sensor.  Points and Rects are kept in sensor pixels.
+binx = 1
+biny = 1
+
 
 def setImageSize(newx, newy):
     global x, y, xpad, ypad, maxd, x_fwd, x_rev, y_fwd, y_rev
@@ -66,6 +71,12 @@ def setImageSize(newx, newy):
         maxd = newy
 
 
+def setBinning(newbinx, newbiny):
+    global binx, biny
+    binx = int(newbinx)
+    biny = int(newbiny)
+
+
 # Get the desired QImage size (oriented!)
 def getSize():
     global x, y, orientation
@@ -124,11 +135,13 @@ class Point(object):
     # Create with absolute image coordinates by default.
     #
     # x, y are absolute image coordinates of the point, abs() is the absolute image QPointF, and
-    # oriented() is the correctly oriented QPointF.
+    # oriented() is the correctly oriented QPointF.  The absolute coordinates are sensor pixels,
+    # the oriented ones are pixels of the binned image.
     def __init__(self, xx, yy, rel=False):
         self._abs = None
         self._rel = None
         self.orientation = -1
+        self.binning = None
         if rel:
             self.setRel(xx, yy)
         else:
@@ -152,6 +165,7 @@ class Point(object):
             self._abs = QPointF(yy, y - 1 - xx)
         elif orientation == ORIENT270F:
             self._abs = QPointF(x - 1 - yy, y - 1 - xx)
+        self._abs = QPointF(self._abs.x() * binx, self._abs.y() * biny)
         self.x = self._abs.x()
         self.y = self._abs.y()
 
@@ -159,6 +173,7 @@ class Point(object):
         global orientation
         self._rel = QPointF(xx, yy)
         self.orientation = orientation
+        self.binning = (binx, biny)
         self.calcAbs(xx, yy)
 
     def setAbs(self, xx, yy):
@@ -172,25 +187,33 @@ class Point(object):
 
     def oriented(self):
         global orientation, x, y
-        if self.orientation == orientation and self._rel is not None:
+        if (
+            self.orientation == orientation
+            and self.binning == (binx, biny)
+            and self._rel is not None
+        ):
             return self._rel
         self.orientation = orientation
+        self.binning = (binx, biny)
+        # The binned pixel the sensor pixel is in.
+        xx = self.x // binx
+        yy = self.y // biny
         if orientation == ORIENT0:
-            self._rel = QPointF(self.x, self.y)
+            self._rel = QPointF(xx, yy)
         elif orientation == ORIENT0F:
-            self._rel = QPointF(x - 1 - self.x, self.y)
+            self._rel = QPointF(x - 1 - xx, yy)
         elif orientation == ORIENT90:
-            self._rel = QPointF(self.y, x - 1 - self.x)
+            self._rel = QPointF(yy, x - 1 - xx)
         elif orientation == ORIENT90F:
-            self._rel = QPointF(self.y, self.x)
+            self._rel = QPointF(yy, xx)
         elif orientation == ORIENT180:
-            self._rel = QPointF(x - 1 - self.x, y - 1 - self.y)
+            self._rel = QPointF(x - 1 - xx, y - 1 - yy)
         elif orientation == ORIENT180F:
-            self._rel = QPointF(self.x, y - 1 - self.y)
+            self._rel = QPointF(xx, y - 1 - yy)
         elif orientation == ORIENT270:
-            self._rel = QPointF(y - 1 - self.y, self.x)
+            self._rel = QPointF(y - 1 - yy, xx)
         elif orientation == ORIENT270F:
-            self._rel = QPointF(y - 1 - self.y, x - 1 - self.x)
+            self._rel = QPointF(y - 1 - yy, x - 1 - xx)
         return self._rel
 
     def pr(self, text=""):
@@ -199,11 +222,13 @@ class Point(object):
 
 
 class Rect(object):
-    # Create with absolute image coordinates by default
+    # Create with absolute image coordinates by default.  Like Point, these are sensor pixels,
+    # and the oriented ones are pixels of the binned image.
     def __init__(self, xx, yy, ww, hh, rel=False):
         self._abs = None
         self._rel = None
         self.orientation = -1
+        self.binning = None
         if rel:
             self.setRel(xx, yy, ww, hh)
         else:
@@ -219,6 +244,7 @@ class Rect(object):
             hh = hh
         self._rel = QRectF(xx, yy, ww, hh)
         self.orientation = orientation
+        self.binning = (binx, biny)
         self.calcAbs(xx, yy, ww, hh)
 
     def setAbs(self, xx, yy, ww, hh):
@@ -255,6 +281,12 @@ class Rect(object):
             self._abs = QRectF(yy, y - xx - ww, hh, ww)
         elif orientation == ORIENT270F:
             self._abs = QRectF(x - yy - hh, y - xx - ww, hh, ww)
+        self._abs = QRectF(
+            self._abs.x() * binx,
+            self._abs.y() * biny,
+            self._abs.width() * binx,
+            self._abs.height() * biny,
+        )
         self.x = self._abs.x()
         self.y = self._abs.y()
         self.w = self._abs.width()
@@ -265,25 +297,34 @@ class Rect(object):
 
     def oriented(self):
         global orientation, x, y
-        if self.orientation == orientation and self._rel is not None:
+        if (
+            self.orientation == orientation
+            and self.binning == (binx, biny)
+            and self._rel is not None
+        ):
             return self._rel
         self.orientation = orientation
+        self.binning = (binx, biny)
+        xx = self.x / binx
+        yy = self.y / biny
+        ww = self.w / binx
+        hh = self.h / biny
         if orientation == ORIENT0:
-            self._rel = QRectF(self.x, self.y, self.w, self.h)
+            self._rel = QRectF(xx, yy, ww, hh)
         elif orientation == ORIENT0F:
-            self._rel = QRectF(x - self.x - self.w, self.y, self.w, self.h)
+            self._rel = QRectF(x - xx - ww, yy, ww, hh)
         elif orientation == ORIENT90:
-            self._rel = QRectF(self.y, x - self.x - self.w, self.h, self.w)
+            self._rel = QRectF(yy, x - xx - ww, hh, ww)
         elif orientation == ORIENT90F:
-            self._rel = QRectF(self.y, self.x, self.h, self.w)
+            self._rel = QRectF(yy, xx, hh, ww)
         elif orientation == ORIENT180:
-            self._rel = QRectF(x - self.x - self.w, y - self.y - self.h, self.w, self.h)
+            self._rel = QRectF(x - xx - ww, y - yy - hh, ww, hh)
         elif orientation == ORIENT180F:
-            self._rel = QRectF(self.x, y - self.y - self.h, self.w, self.h)
+            self._rel = QRectF(xx, y - yy - hh, ww, hh)
         elif orientation == ORIENT270:
-            self._rel = QRectF(y - self.y - self.h, self.x, self.h, self.w)
+            self._rel = QRectF(y - yy - hh, xx, hh, ww)
         elif orientation == ORIENT270F:
-            self._rel = QRectF(y - self.y - self.h, x - self.x - self.w, self.h, self.w)
+            self._rel = QRectF(y - yy - hh, x - xx - ww, hh, ww)
         return self._rel
 
     # These all set in *oriented* coordinates!
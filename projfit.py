@@ -0,0 +1,143 @@
+"""
+Fast fits of the projections, without lmfit.
+
+The starting point comes in closed form from the moments of the projection
+above its base, and is then refined with a few Gauss-Newton steps.  If the
+fit of the previous frame is passed in, the steps start from it instead,
+which usually converges in one or two.  The lineshapes and the definitions of
+fwhm and e2w are those of the lmfit models in fitmodels, so this and the
+precise (lmfit) fits can be compared directly.
+"""
+import math
+
+import numpy as np
+
+GAUSSIAN = 0
+SG4 = 4
+SG6 = 6
+
+# The most Gauss-Newton steps per fit, and when they have converged.
+MAX_STEPS = 5
+TOLERANCE = 1.0e-6
+
+S2PI = math.sqrt(2 * math.pi)
+FWHM_FACTOR = {GAUSSIAN: 2 * math.sqrt(2 * math.log(2)), SG4: 1.5345, SG6: 1.6762}
+E2W_FACTOR = {GAUSSIAN: 4.0, SG4: 2.0, SG6: 2.0}
+
+
+class FitResult:
+    """
+    A fit of kind to a projection.  params is (amplitude, center, width,
+    base), where amplitude and width are as in the lmfit models: the area and
+    sigma of a Gaussian, and the peak and width of a super Gaussian.
+    """
+
+    def __init__(self, kind, with_base, params, best_fit):
+        self.kind = kind
+        self.with_base = with_base
+        self.params = params
+        self.best_fit = best_fit
+        self.fwhm = FWHM_FACTOR[kind] * params[2]
+        self.e2w = E2W_FACTOR[kind] * params[2]
+
+
+def _model(kind, x, params):
+    """The lineshape and its Jacobian by (amplitude, center, width, base)."""
+    amplitude, center, width, base = params
+    u = x - center
+    jac = np.empty((len(x), 4))
+    if kind == GAUSSIAN:
+        g = np.exp(-(u**2) / (2 * width**2)) / (S2PI * width)
+        f = amplitude * g
+        jac[:, 0] = g
+        jac[:, 1] = f * u / width**2
+        jac[:, 2] = f * (u**2 / width**3 - 1 / width)
+    else:
+        t = (u / width) ** kind
+        g = np.exp(-2.0 * t)
+        f = amplitude * g
+        jac[:, 0] = g
+        jac[:, 1] = f * 2.0 * kind * (u / width) ** (kind - 1) / width
+        jac[:, 2] = f * 2.0 * kind * t / width
+    jac[:, 3] = 1.0
+    return f + base, jac
+
+
+def _moments(kind, with_base, x, y):
+    """The closed form estimate from the moments of y above its base."""
+    base = float(np.min(y)) if with_base else 0.0
+    w = np.clip(y - base, 0, None)
+    total = w.sum()
+    if total <= 0:
+        return None
+    center = float(np.dot(w, x) / total)
+    var = float(np.dot(w, (x - center) ** 2) / total)
+    if var <= 0:
+        return None
+    area = total * abs(x[-1] - x[0]) / max(len(x) - 1, 1)
+    if kind == GAUSSIAN:
+        return np.array([area, center, math.sqrt(var), base])
+    # The variance of exp(-2 (u / w)^p) is w^2 G(3/p) / (G(1/p) 2^(2/p)), and
+    # its area w 2 G(1 + 1/p) / 2^(1/p).
+    p = float(kind)
+    width = math.sqrt(var * math.gamma(1 / p) * 2 ** (2 / p) / math.gamma(3 / p))
+    peak = area * 2 ** (1 / p) / (2 * width * math.gamma(1 + 1 / p))
+    return np.array([peak, center, width, base])
+
+
+def _refine(kind, with_base, x, y, params):
+    """A few Gauss-Newton steps from params, halving any that don't help."""
+    cols = 4 if with_base else 3
+    f, jac = _model(kind, x, params)
+    cost = np.dot(y - f, y - f)
+    for _ in range(MAX_STEPS):
+        step = np.linalg.lstsq(jac[:, :cols], y - f, rcond=None)[0]
+        for _ in range(8):
+            trial = params.copy()
+            trial[:cols] += step
+            if trial[2] > 0:
+                tf, tjac = _model(kind, x, trial)
+                tcost = np.dot(y - tf, y - tf)
+                if tcost <= cost:
+                    break
+            step = step / 2
+        else:
+            break
+        converged = cost - tcost <= TOLERANCE * cost
+        params, f, jac, cost = trial, tf, tjac, tcost
+        if converged:
+            break
+    return params, f, cost
+
+
+def fit(kind, with_base, x, y, previous=None):
+    """
+    Fit kind to the projection y at pixels x.  If previous is the FitResult
+    of the last frame, start from it rather than from the moments, unless
+    that ends up worse than the moments themselves (the beam jumped).
+    Returns a FitResult, or None if y has nothing to fit.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) < 4:
+        return None
+    start = _moments(kind, with_base, x, y)
+    if start is None:
+        return None
+    result = None
+    if (
+        previous is not None
+        and previous.kind == kind
+        and previous.with_base == with_base
+        and np.all(np.isfinite(previous.params))
+    ):
+        result = _refine(kind, with_base, x, y, previous.params.copy())
+        f = _model(kind, x, start)[0]
+        if not result[2] <= np.dot(y - f, y - f):
+            result = None
+    if result is None:
+        result = _refine(kind, with_base, x, y, start)
+    params, best_fit, _ = result
+    if not np.all(np.isfinite(params)):
+        return None
+    return FitResult(kind, with_base, params, best_fit)